@@ -0,0 +1,96 @@
+"""Overhead benchmark for the background-traffic sampler.
+
+Runs BandwidthMonitor the way the agent does: ``sample_system`` at the
+fastest tick rate and ``scan_processes`` every PROCESS_IO_INTERVAL seconds,
+optionally with a local download saturating loopback, and reports the CPU
+time both took as a share of one core. The budget is 1%.
+
+    python bench_bandwidth.py [seconds] [--load]
+"""
+import os
+import sys
+import time
+import socket
+import threading
+
+from lagsense_agent.config import SAMPLE_RATES, PROCESS_IO_INTERVAL
+from lagsense_agent.bandwidth import BandwidthMonitor
+
+BUDGET_PERCENT = 1.0
+
+
+def loopback_download(stop):
+    """Stream bytes over loopback until ``stop`` is set, so there is traffic to attribute"""
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen(1)
+
+    def send():
+        conn, _ = server.accept()
+        chunk = b"\0" * 65536
+        while not stop.is_set():
+            conn.sendall(chunk)
+            time.sleep(0.001)
+        conn.close()
+
+    threading.Thread(target=send, daemon=True).start()
+    client = socket.create_connection(server.getsockname())
+    while not stop.is_set():
+        if not client.recv(65536):
+            break
+    client.close()
+    server.close()
+
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    seconds = float(args[0]) if args else 30
+    rate = max(SAMPLE_RATES.values())
+
+    stop = threading.Event()
+    if "--load" in sys.argv:
+        threading.Thread(target=loopback_download, args=(stop,), daemon=True).start()
+
+    monitor = BandwidthMonitor()
+    # Imports psutil and primes the counters outside the measurement
+    monitor.sample_system()
+    monitor.scan_processes()
+    system_cpu = scan_cpu = 0.0
+    samples = scans = 0
+    started = time.monotonic()
+    next_scan = started
+    next_tick = started
+    while time.monotonic() - started < seconds:
+        # thread_time: only the sampler's own CPU, not the load generator's
+        t = time.thread_time()
+        monitor.sample_system()
+        system_cpu += time.thread_time() - t
+        samples += 1
+
+        if time.monotonic() >= next_scan:
+            # The scan may run ``ss``; count the child's CPU too
+            t, children = time.thread_time(), os.times()
+            monitor.scan_processes()
+            after = os.times()
+            scan_cpu += (time.thread_time() - t
+                         + after.children_user - children.children_user
+                         + after.children_system - children.children_system)
+            scans += 1
+            next_scan += PROCESS_IO_INTERVAL
+
+        next_tick += 1 / rate
+        time.sleep(max(0.0, next_tick - time.monotonic()))
+    stop.set()
+
+    elapsed = time.monotonic() - started
+    total = (system_cpu + scan_cpu) / elapsed * 100
+    print(f"duration:        {elapsed:.1f} s at {rate:g} Hz")
+    print(f"system sample:   {system_cpu / samples * 1e6:.0f} us x {samples}")
+    print(f"process scan:    {scan_cpu / scans * 1e3:.2f} ms x {scans} ({PROCESS_IO_INTERVAL} s interval)")
+    print(f"CPU share:       {total:.3f}% of one core (budget {BUDGET_PERCENT:g}%)")
+    print(f"top talkers:     {monitor.summary()}")
+    return 0 if total < BUDGET_PERCENT else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
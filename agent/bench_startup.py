@@ -0,0 +1,72 @@
+"""Cold-start benchmark for the agent.
+
+Spawns ``python -m lagsense_agent --dry-run`` repeatedly and reports the
+time until it prints its ready line plus its resident memory at that point.
+
+    python bench_startup.py [runs]
+"""
+import os
+import sys
+import time
+import statistics
+import subprocess
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+HEAVY_MODULES = ("requests", "psutil", "numpy", "win32gui", "win32process")
+
+
+def rss_kb(pid):
+    """Resident set size of a process in KiB"""
+    try:
+        import psutil
+        return psutil.Process(pid).memory_info().rss // 1024
+    except ImportError:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    return 0
+
+
+def one_run():
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "lagsense_agent", "--dry-run", "--duration", "5"],
+        cwd=HERE, stdout=subprocess.PIPE, text=True, encoding="utf-8",
+        env={**os.environ, "PYTHONIOENCODING": "utf-8"}
+    )
+    try:
+        for line in proc.stdout:
+            if "ready" in line:
+                ready_ms = (time.perf_counter() - started) * 1000
+                return ready_ms, rss_kb(proc.pid)
+        raise RuntimeError("agent exited before becoming ready")
+    finally:
+        proc.kill()
+        proc.wait()
+
+
+def eager_imports():
+    """Heavy modules that importing the agent pulls in (should be none)"""
+    code = (
+        "import sys, lagsense_agent.app; "
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    out = subprocess.run([sys.executable, "-c", code], cwd=HERE, capture_output=True, text=True)
+    return out.stdout.strip() or "none"
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    results = [one_run() for _ in range(runs)]
+    ready = sorted(r[0] for r in results)
+    rss = [r[1] for r in results]
+
+    print(f"runs:            {runs}")
+    print(f"ready p50 / max: {statistics.median(ready):.0f} ms / {ready[-1]:.0f} ms")
+    print(f"RSS at ready:    {statistics.median(rss) / 1024:.1f} MiB")
+    print(f"eager imports:   {eager_imports()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+IDLE = "idle"
+ACTIVE = "active"
+COOLDOWN = "cooldown"
+
+
+# ---------- POWER / NETWORK STATE ----------
+def on_battery():
+    """True when running on battery power (laptops)"""
+    try:
+        import psutil
+
+        battery = psutil.sensors_battery()
+        return battery is not None and not battery.power_plugged
+    except Exception:
+        return False
+
+
+def network_up():
+    """True when at least one non-loopback interface is up"""
+    try:
+        import psutil
+
+        for name, stats in psutil.net_if_stats().items():
+            if stats.isup and not name.lower().startswith(("lo", "loopback")):
+                return True
+        return False
+    except Exception:
+        return True
+
+
+def process_start_time(pid):
+    """Creation time of a process (identifies it across PID reuse), or None"""
+    import psutil
+
+    try:
+        return psutil.Process(pid).create_time()
+    except (psutil.NoSuchProcess, psutil.AccessDenied):
+        return None
+
+
+def pid_running(pid, started=None):
+    """Cheap liveness check for an already-known process
+
+    With ``started`` (its process_start_time when it was found), a
+    different process that has since been given the same PID doesn't count.
+    """
+    import psutil
+
+    try:
+        proc = psutil.Process(pid)
+        return proc.is_running() and (started is None or proc.create_time() == started)
+    except (psutil.NoSuchProcess, psutil.AccessDenied):
+        return False
+
+
+# ---------- ACTIVITY STATE MACHINE ----------
+class ActivityMonitor:
+    """Idle / active / cooldown state machine for the agent.
+
+    IDLE: no game; only a full process scan every ``idle_interval`` seconds
+    and no network probing at all.
+    ACTIVE: a game is running; its PID (and start time, so a reused PID
+    isn't mistaken for it) is re-checked cheaply each scan and probing is
+    enabled.
+    COOLDOWN: the game just exited; scans start fast (so a relaunch between
+    matches is caught) and back off exponentially until they reach the
+    idle interval, at which point the monitor is IDLE again.
+    """
+
+    def __init__(self, find_game, active_interval=2, idle_interval=10,
+                 battery_factor=3, is_running=pid_running, start_time=process_start_time,
+                 on_battery=on_battery, network_up=network_up):
+        self.state = IDLE
+        self.game = None
+        self.pid = None
+        self.pid_started = None
+        self.on_battery = False
+        self.network_up = True
+        self._find_game = find_game
+        self._is_running = is_running
+        self._start_time = start_time
+        self._check_battery = on_battery
+        self._check_network = network_up
+        self._active_interval = active_interval
+        self._idle_interval = idle_interval
+        self._battery_factor = battery_factor
+        self._cooldown_interval = idle_interval
+
+    @property
+    def scan_interval(self):
+        """Seconds until the next scan in the current state"""
+        if self.state == ACTIVE:
+            return self._active_interval
+        if self.state == COOLDOWN:
+            return self._cooldown_interval
+        interval = self._idle_interval
+        if self.on_battery:
+            interval *= self._battery_factor
+        return interval
+
+    @property
+    def probing(self):
+        """Whether latency / loss probes should run right now"""
+        return self.state == ACTIVE and self.network_up
+
+    def scan(self):
+        """Detect the running game and advance the state machine; returns the game"""
+        self.on_battery = self._check_battery()
+
+        if self.pid is not None and self._is_running(self.pid, self.pid_started):
+            game, pid = self.game, self.pid
+        else:
+            game, pid = self._find_game()
+            self.pid_started = self._start_time(pid) if pid else None
+
+        if game:
+            self.state = ACTIVE
+            # Only check connectivity while it matters
+            self.network_up = self._check_network()
+        elif self.state == ACTIVE:
+            self.state = COOLDOWN
+            self._cooldown_interval = self._active_interval
+        elif self.state == COOLDOWN:
+            self._cooldown_interval *= 2
+            if self._cooldown_interval >= self._idle_interval:
+                self.state = IDLE
+
+        self.game, self.pid = game, pid
+        return game
@@ -0,0 +1,332 @@
+import time
+import json
+import threading
+import argparse
+from datetime import datetime
+
+# Only cheap, stdlib-backed modules are imported here; the HTTP client, psutil and
+# the Windows modules load on first use so the agent is ready quickly
+from . import __version__, config
+from .config import sample_rate_for
+from .scheduler import FixedRateScheduler, PeriodicWorker, QueueWorker
+from .activity import ActivityMonitor
+from .stats import SessionStats
+from .probes import tcp_latency, probe_packet_loss, probe_endpoints, find_game_process
+from .discovery import ServerDiscovery
+from .segments import SegmentProber
+from .bandwidth import BandwidthMonitor
+from .notify import check_and_notify
+from .wire import CONTENT_TYPE, encode_frame
+from .client import ApiClient, ApiUnavailable
+
+
+class Agent:
+    """Background sampling loop: detect the game, probe, upload"""
+
+    def __init__(self, api=config.API, user_id=config.USER_ID, dry_run=False,
+                 wire_format=config.WIRE_FORMAT):
+        self.api = api
+        self.user_id = user_id
+        self.dry_run = dry_run
+        self.binary = wire_format == "binary"
+        self.client = ApiClient(api)
+        self._thresholds = None
+        self._thresholds_at = 0
+        self.batch = []
+        self.batch_started = None
+
+        self.last_game = None
+        self.session_active = False
+        self.session_stats = SessionStats()
+        self.reported_missed = 0
+        self.reported_clock_steps = 0
+
+        # Slow work runs off the tick thread so it can't stretch the sampling period
+        self.scheduler = FixedRateScheduler(sample_rate_for(None))
+        self.monitor = ActivityMonitor(
+            find_game_process,
+            active_interval=config.ACTIVE_SCAN_INTERVAL,
+            idle_interval=config.IDLE_SCAN_INTERVAL,
+            battery_factor=config.IDLE_BATTERY_FACTOR
+        )
+        self.loss_worker = PeriodicWorker(
+            "loss-probe", probe_packet_loss, config.LOSS_PROBE_INTERVAL,
+            on_result=self._on_loss_probe, when=lambda: self.monitor.probing
+        )
+        self.game_worker = PeriodicWorker(
+            "game-scan", self.monitor.scan, lambda: self.monitor.scan_interval,
+            on_result=self._on_scan
+        )
+        self.discovery = ServerDiscovery()
+        self.server_worker = PeriodicWorker(
+            "server-probe", self._probe_servers, config.SERVER_PROBE_INTERVAL,
+            when=lambda: self.monitor.probing
+        )
+        self.segments = SegmentProber()
+        self.segment_worker = PeriodicWorker(
+            "segment-targets", self.segments.refresh_targets, config.SEGMENT_TARGETS_TTL,
+            when=lambda: self.monitor.probing
+        )
+        self.bandwidth = BandwidthMonitor()
+        self.talker_worker = PeriodicWorker(
+            "talker-scan", self._scan_talkers, config.PROCESS_IO_INTERVAL,
+            when=lambda: self.monitor.probing
+        )
+        self.uploader = QueueWorker("uploader")
+
+    # ---------- WORKER CALLBACKS ----------
+    def _on_loss_probe(self, probe):
+        if probe:
+            self.session_stats.add_loss(*probe)
+
+    def _on_scan(self, game):
+        self.scheduler.set_rate(sample_rate_for(game, self.monitor.on_battery))
+        if self.monitor.probing:
+            for worker in (self.loss_worker, self.server_worker, self.segment_worker):
+                if worker.updated_at is None:
+                    worker.wake()
+
+    def _probe_servers(self):
+        """RTT / loss to the game's live remote endpoints (discovered from its sockets)"""
+        endpoints = self.discovery.endpoints_for(self.monitor.pid)
+        return probe_endpoints(endpoints, count=config.SERVER_PROBE_COUNT)
+
+    def _scan_talkers(self):
+        """Busiest processes other than the game (its own traffic is not background traffic)"""
+        return self.bandwidth.scan_processes(exclude=(self.monitor.pid,) if self.monitor.pid else ())
+
+    # ---------- UPLOAD SAMPLE ----------
+    def upload_sample(self, payload):
+        """Post one sample and run notification checks (runs on the uploader thread)"""
+        if self.dry_run:
+            print(json.dumps(payload))
+            return
+
+        try:
+            response = self.client.post("/stat", json_body=payload, samples=1)
+            if response.status_code in (200, 202):
+                self._after_upload(payload)
+            else:
+                print(f"✗ API error: {response.status_code}")
+        except ApiUnavailable as e:
+            print(f"✗ Connection error: {e}")
+
+    def upload_batch(self, samples):
+        """Post a batch of samples as one binary frame (runs on the uploader thread)"""
+        body, encoding = encode_frame(self.user_id, samples[0]["game"], samples)
+        if self.dry_run:
+            print(f"→ frame: {len(samples)} samples, {len(body)} bytes ({encoding or 'identity'})")
+            return
+
+        headers = {"Content-Type": CONTENT_TYPE}
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        try:
+            response = self.client.post("/stat/batch", data=body, headers=headers, samples=len(samples))
+            if response.status_code in (200, 202):
+                self._after_upload(samples[-1])
+            elif response.status_code in (404, 415):
+                # Backend predates binary ingest: fall back to JSON for good
+                print("⚠ Backend has no binary ingest, switching to JSON uploads")
+                self.binary = False
+                for payload in samples:
+                    self.upload_sample(payload)
+            else:
+                print(f"✗ API error: {response.status_code}")
+        except ApiUnavailable as e:
+            print(f"✗ Connection error: {e}")
+
+    def _after_upload(self, payload):
+        """Log the latest sample and check it against the user's thresholds"""
+        game = payload["game"]
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] {game.upper():8} | Ping: {payload['ping']:6.1f}ms | Jitter: {payload['jitter']:5.2f}ms | Loss: {payload['loss']:5.2f}%")
+
+        telemetry = self.client.telemetry
+        if telemetry.requests % config.TELEMETRY_LOG_EVERY == 0:
+            print(f"📡 {telemetry.summary()}")
+
+        try:
+            thresholds = self.get_thresholds().get(game, {"ping": 100, "jitter": 20, "loss": 5})
+            check_and_notify(payload["ping"], payload["jitter"], payload["loss"], game, thresholds)
+        except Exception:
+            pass
+
+    def get_thresholds(self):
+        """User thresholds from the backend, cached for THRESHOLDS_TTL seconds"""
+        now = time.monotonic()
+        if self._thresholds is None or now - self._thresholds_at > config.THRESHOLDS_TTL:
+            settings_data = self.client.get(f"/settings/{self.user_id}").json()
+            self._thresholds = settings_data.get("thresholds", {})
+            self._thresholds_at = now
+        return self._thresholds
+
+    def flush_batch(self):
+        """Hand the pending batch to the uploader"""
+        if self.batch:
+            self.uploader.submit(self.upload_batch, self.batch)
+            self.batch = []
+
+    # ---------- SESSION END ----------
+    def end_session(self, game):
+        """End current game session"""
+        if self.dry_run:
+            print(f"✓ Session ended for {game}")
+            return
+
+        try:
+            self.client.post(f"/end-session/{self.user_id}/{game}")
+            print(f"✓ Session ended for {game}")
+        except Exception as e:
+            print(f"✗ Failed to end session: {e}")
+
+    # ---------- MAIN LOOP ----------
+    def start(self):
+        self.loss_worker.start()
+        self.game_worker.start()
+        self.server_worker.start()
+        self.segment_worker.start()
+        self.talker_worker.start()
+        self.uploader.start()
+
+    def stop(self):
+        self.scheduler.stop()
+
+    def tick(self, deadline):
+        """One sampling tick"""
+        scheduler = self.scheduler
+        if scheduler.missed_ticks != self.reported_missed:
+            print(f"⚠ Missed {scheduler.missed_ticks - self.reported_missed} tick(s) at {1 / scheduler.period:g} Hz")
+            self.reported_missed = scheduler.missed_ticks
+        if scheduler.clock_steps != self.reported_clock_steps:
+            print("⚠ System clock jumped; sample timestamps re-anchored")
+            self.reported_clock_steps = scheduler.clock_steps
+
+        game = self.game_worker.latest
+
+        # Game closed
+        if self.session_active and self.last_game and game != self.last_game:
+            self.flush_batch()
+            self.uploader.submit(self.end_session, self.last_game)
+            self.session_active = False
+            self.last_game = None
+            self.session_stats.reset()
+            self.loss_worker.latest = None
+            self.loss_worker.updated_at = None
+            self.server_worker.latest = None
+            self.server_worker.updated_at = None
+            self.discovery.reset()
+            self.segments.reset()
+            self.bandwidth.reset()
+
+        # Idle (or offline): nothing to measure until a game shows up
+        if not game or not self.monitor.probing:
+            return
+
+        # A probe slower than the period shows up as missed ticks. The LAN
+        # and ISP segments are probed at the same time as the remote target
+        latency = self.segments.measure(lambda: tcp_latency(config.REMOTE_HOST, config.REMOTE_PORT))
+        if latency is None:
+            return
+
+        baseline = self.session_stats.ewma.value
+        self.session_stats.add_rtt(latency)
+        self.bandwidth.sample_system()
+        last_probe = self.loss_worker.latest
+        loss = round((last_probe[0] - last_probe[1]) / last_probe[0] * 100, 2) if last_probe else 0
+
+        payload = {
+            "user_id": self.user_id,
+            "game": game,
+            "ping": latency,
+            "loss": loss,
+            "timestamp": scheduler.wall_time(deadline).isoformat(),
+            **self.session_stats.snapshot(),
+            "segments": self.segments.snapshot()
+        }
+        endpoints = self.server_worker.latest
+        if endpoints:
+            primary = endpoints[0]
+            host = f"[{primary['host']}]" if ":" in primary["host"] else primary["host"]
+            payload["server"] = f"{host}:{primary['port']}"
+            payload["server_rtt"] = primary["rtt"]
+            payload["server_loss"] = primary["loss"]
+            payload["endpoints"] = endpoints
+        if (baseline and latency >= baseline * config.SPIKE_FACTOR
+                and latency - baseline >= config.SPIKE_MIN_MS):
+            payload["top_talkers"] = self.bandwidth.summary()
+
+        if self.binary and "top_talkers" not in payload:
+            # A frame carries one server
+            if self.batch and self.batch[0].get("server") != payload.get("server"):
+                self.flush_batch()
+            if not self.batch:
+                self.batch_started = deadline
+            self.batch.append(payload)
+            if (len(self.batch) >= config.BATCH_MAX_SAMPLES
+                    or deadline - self.batch_started >= config.BATCH_MAX_SECONDS):
+                self.flush_batch()
+        else:
+            # Spike samples carry a variable-size summary, which fixed-size
+            # frame records can't; they go as JSON, after the pending batch
+            self.flush_batch()
+            self.uploader.submit(self.upload_sample, payload)
+        self.session_active = True
+        self.last_game = game
+
+    def run(self, duration=None):
+        """Tick until stopped, interrupted or ``duration`` seconds have passed"""
+        if duration is not None:
+            timer = threading.Timer(duration, self.stop)
+            timer.daemon = True
+            timer.start()
+
+        while True:
+            try:
+                deadline = self.scheduler.wait()
+                if deadline is None:
+                    break
+                self.tick(deadline)
+            except KeyboardInterrupt:
+                break
+            except Exception as e:
+                print(f"✗ Error: {e}")
+
+        self.flush_batch()
+        if self.session_active and self.last_game:
+            self.uploader.submit(self.end_session, self.last_game)
+        self.uploader.stop()
+        self.segments.close()
+        self.client.close()
+        if self.client.telemetry.requests:
+            print(f"📡 {self.client.telemetry.summary()}")
+        print("\n✓ LagSense Agent stopped")
+
+
+def print_banner():
+    print("=" * 60)
+    print(f"LagSense Background Agent v{__version__} - Production Ready")
+    print("=" * 60)
+    print("🎮 Monitoring: Valorant, CS2, Dota2, Fortnite, Discord")
+    print("📊 Measuring: Ping, Jitter, Packet Loss")
+    print("🔔 Notifications: Every 20 minutes max")
+    print("🔄 Background Monitoring: Always active")
+    print("=" * 60)
+
+
+def main(argv=None):
+    started = time.perf_counter()
+
+    parser = argparse.ArgumentParser(prog="lagsense_agent", description="LagSense background agent")
+    parser.add_argument("--api", default=config.API, help="backend base URL")
+    parser.add_argument("--user-id", type=int, default=config.USER_ID)
+    parser.add_argument("--dry-run", action="store_true", help="print samples instead of uploading them")
+    parser.add_argument("--duration", type=float, default=None, help="stop after this many seconds")
+    parser.add_argument("--wire", choices=("binary", "json"), default=config.WIRE_FORMAT, help="upload format")
+    args = parser.parse_args(argv)
+
+    print_banner()
+    agent = Agent(api=args.api, user_id=args.user_id, dry_run=args.dry_run, wire_format=args.wire)
+    agent.start()
+    print(f"✓ Agent ready in {(time.perf_counter() - started) * 1000:.0f} ms", flush=True)
+    agent.run(duration=args.duration)
+    return 0
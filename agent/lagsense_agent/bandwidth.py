@@ -0,0 +1,152 @@
+import os
+import re
+import sys
+import time
+import shutil
+import subprocess
+from collections import deque
+
+from .config import TALKER_HISTORY, TOP_TALKERS
+
+SS_USERS = re.compile(r'users:\(\("([^"]*)",pid=(\d+)')
+SS_BYTES = re.compile(r"bytes_(?:acked|received):(\d+)")
+
+
+# ---------- PER-PROCESS COUNTERS ----------
+def socket_counters():
+    """Cumulative TCP bytes per socket from ``ss``: {(pid, local, peer): (name, pid, bytes)}
+
+    Linux keeps no per-process network totals, but it does keep
+    per-socket ones (tcp_info). Sockets that closed between two reads are
+    missed, and so is UDP.
+    """
+    out = subprocess.run(["ss", "-tinpH"], capture_output=True, text=True).stdout
+    counters = {}
+    key = None
+    for line in out.splitlines():
+        if not line[:1].isspace():
+            # Socket line: state, queues, local, peer, users:(("name",pid=..,fd=..))
+            fields = line.split()
+            users = SS_USERS.search(line)
+            key = None
+            if users and len(fields) >= 5:
+                name, pid = users.group(1), int(users.group(2))
+                key = (pid, fields[3], fields[4])
+        elif key is not None:
+            # tcp_info line that belongs to the socket above
+            counters[key] = (name, pid, sum(int(n) for n in SS_BYTES.findall(line)))
+            key = None
+    return counters
+
+
+def process_counters():
+    """Cumulative I/O bytes per process from psutil: {pid: (name, pid, bytes)}
+
+    On Windows these transfer counters include network I/O. Elsewhere they
+    are only a proxy (disk traffic is in there too).
+    """
+    import psutil
+
+    counters = {}
+    for proc in psutil.process_iter(["name", "io_counters"]):
+        io = proc.info["io_counters"]
+        if io is None:
+            # Access denied (another user's process) or gone
+            continue
+        total = io.read_bytes + io.write_bytes + getattr(io, "other_bytes", 0)
+        counters[proc.pid] = (proc.info["name"], proc.pid, total)
+    return counters
+
+
+def default_counters():
+    """Best counter reader for this OS and what it measures: "tcp" (socket bytes) or "io" (all process I/O)"""
+    if sys.platform.startswith("linux") and shutil.which("ss"):
+        return socket_counters, "tcp"
+    return process_counters, "io"
+
+
+# ---------- BANDWIDTH MONITOR ----------
+class BandwidthMonitor:
+    """System NIC throughput and a ring buffer of the busiest processes.
+
+    ``sample_system`` is one counter read and meant for every tick.
+    ``scan_processes`` reads per-process (or per-socket) byte counters and
+    belongs on a slow background worker; each scan keeps the top ``top``
+    processes by rate, and the last ``history`` scans are kept. ``summary``
+    is the compact form attached to a sample.
+
+    ``source`` says what the per-process figures are: "tcp" for socket
+    byte counters, "io" for process I/O counters, which also count disk
+    traffic and so are not link usage. The agent's own process is never
+    reported.
+    """
+
+    def __init__(self, history=TALKER_HISTORY, top=TOP_TALKERS, read_counters=None, source="io"):
+        if read_counters is None:
+            read_counters, source = default_counters()
+        self.top = top
+        self.source = source
+        self.down_kbps = 0.0
+        self.up_kbps = 0.0
+        self.talkers = deque(maxlen=history)
+        self._read_counters = read_counters
+        self._last_net = None
+        self._last_counters = {}
+        self._last_scan = None
+
+    def sample_system(self):
+        """NIC throughput since the previous call as (down_kbps, up_kbps)"""
+        import psutil
+
+        now = time.monotonic()
+        counters = psutil.net_io_counters()
+        if self._last_net is not None:
+            then, sent, received = self._last_net
+            elapsed = now - then
+            if elapsed > 0:
+                self.down_kbps = max(counters.bytes_recv - received, 0) * 8 / 1000 / elapsed
+                self.up_kbps = max(counters.bytes_sent - sent, 0) * 8 / 1000 / elapsed
+        self._last_net = (now, counters.bytes_sent, counters.bytes_recv)
+        return self.down_kbps, self.up_kbps
+
+    def scan_processes(self, exclude=()):
+        """Per-process byte rate since the previous scan; returns the top talkers as (name, pid, kbps)
+
+        Processes in ``exclude`` (e.g. the game itself) are left out.
+        """
+        now = time.monotonic()
+        counters = self._read_counters()
+        elapsed = now - self._last_scan if self._last_scan is not None else None
+        skip = {os.getpid(), *exclude}
+
+        rates = {}
+        if elapsed:
+            for key, (name, pid, total) in counters.items():
+                if pid in skip:
+                    continue
+                previous = self._last_counters.get(key)
+                if previous is not None and total > previous[2]:
+                    _, _, kbps = rates.get(pid, (name, pid, 0.0))
+                    rates[pid] = (name, pid, kbps + (total - previous[2]) * 8 / 1000 / elapsed)
+
+        self._last_counters = counters
+        self._last_scan = now
+        if elapsed is None:
+            return []
+
+        top = sorted(rates.values(), key=lambda r: r[2], reverse=True)[:self.top]
+        self.talkers.append((now, top))
+        return top
+
+    def summary(self):
+        """Compact top-talker snapshot for a /stat payload"""
+        top = self.talkers[-1][1] if self.talkers else []
+        return {
+            "down_kbps": round(self.down_kbps, 1),
+            "up_kbps": round(self.up_kbps, 1),
+            "source": self.source,
+            "top": [{"name": name, "pid": pid, "kbps": round(kbps, 1)} for name, pid, kbps in top]
+        }
+
+    def reset(self):
+        self.talkers.clear()
@@ -0,0 +1,182 @@
+import json
+import time
+import random
+import threading
+
+from .stats import Ewma, P2Quantile
+
+# Statuses that mean "the server didn't take the request, try again"
+# (the API's own backpressure answers)
+RETRY_STATUSES = (429, 503)
+# A gateway error can come back after the API applied the request, so
+# these are only retried for methods that are safe to repeat
+IDEMPOTENT_RETRY_STATUSES = (502, 504)
+IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+class ApiUnavailable(Exception):
+    """Raised when a request still fails after all retries"""
+
+
+# ---------- UPLOAD TELEMETRY ----------
+class UploadTelemetry:
+    """Running upload latency / size counters for the agent's own reporting"""
+
+    def __init__(self):
+        self.requests = 0
+        self.failures = 0
+        self.retries = 0
+        self.samples = 0
+        self.bytes_sent = 0
+        self.latency = Ewma(alpha=0.1)
+        self.latency_p95 = P2Quantile(0.95)
+        self._lock = threading.Lock()
+
+    def record(self, latency_ms, body_bytes, samples):
+        with self._lock:
+            self.requests += 1
+            self.samples += samples
+            self.bytes_sent += body_bytes
+            self.latency.update(latency_ms)
+            self.latency_p95.update(latency_ms)
+
+    def record_retry(self):
+        with self._lock:
+            self.retries += 1
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+
+    @property
+    def bytes_per_sample(self):
+        return self.bytes_sent / self.samples if self.samples else 0.0
+
+    def summary(self):
+        return (
+            f"uploads {self.requests} ({self.failures} failed, {self.retries} retried) | "
+            f"latency {self.latency.value or 0:.0f}ms avg, {self.latency_p95.value:.0f}ms p95 | "
+            f"{self.bytes_per_sample:.1f} B/sample"
+        )
+
+
+# ---------- POOLED CLIENT ----------
+class ApiClient:
+    """One long-lived HTTP client for every agent -> backend call.
+
+    Uses httpx with HTTP/2 when httpx and h2 are installed, otherwise a
+    requests.Session; either way connections are kept alive and reused
+    instead of paying a TCP + TLS handshake per sample. Failed requests
+    are retried a bounded number of times with full-jitter exponential
+    backoff. Timeouts are the client's own and run on the uploader
+    thread, so they never stall the measurement loop.
+    """
+
+    def __init__(self, base_url, connect_timeout=3.0, read_timeout=5.0,
+                 max_attempts=3, backoff_base=0.25, backoff_cap=4.0):
+        self.base_url = base_url.rstrip("/")
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.telemetry = UploadTelemetry()
+        self.http2 = False
+        self._session = None
+        self._httpx = False
+        self._transport_errors = ()
+        self._retryable_errors = ()
+
+    def _connect(self):
+        try:
+            import httpx
+
+            try:
+                import h2  # noqa: F401 - httpx needs it for HTTP/2
+                self.http2 = True
+            except ImportError:
+                self.http2 = False
+            self._session = httpx.Client(
+                http2=self.http2,
+                timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+                limits=httpx.Limits(max_connections=4, max_keepalive_connections=2)
+            )
+            self._transport_errors = (httpx.TransportError,)
+            # Only retry when the request can't have reached the server
+            self._retryable_errors = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+            self._httpx = True
+        except ImportError:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            self._session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4, max_retries=0)
+            self._session.mount("https://", adapter)
+            self._session.mount("http://", adapter)
+            self._transport_errors = (requests.exceptions.RequestException,)
+            # Only retry when the request can't have reached the server
+            self._retryable_errors = (requests.exceptions.ConnectTimeout, requests.exceptions.ConnectionError)
+
+    def _backoff(self, attempt):
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt)))
+
+    def request(self, method, path, json_body=None, data=None, headers=None, samples=0):
+        """Send a request, retrying transport errors and retryable statuses.
+
+        ``samples`` is how many measurements the body carries; uploads with
+        samples > 0 are counted in the telemetry.
+        """
+        if self._session is None:
+            self._connect()
+
+        headers = dict(headers or {})
+        if json_body is not None:
+            data = json.dumps(json_body).encode("utf-8")
+            headers["Content-Type"] = "application/json"
+
+        if self._httpx:
+            kwargs = {"headers": headers, "content": data}
+        else:
+            kwargs = {"headers": headers, "data": data, "timeout": (self.connect_timeout, self.read_timeout)}
+
+        retry_statuses = RETRY_STATUSES
+        if method.upper() in IDEMPOTENT_METHODS:
+            retry_statuses += IDEMPOTENT_RETRY_STATUSES
+
+        last_error = None
+        for attempt in range(self.max_attempts):
+            if attempt:
+                self.telemetry.record_retry()
+                time.sleep(self._backoff(attempt))
+
+            started = time.perf_counter()
+            try:
+                response = self._session.request(method, f"{self.base_url}{path}", **kwargs)
+            except self._retryable_errors as e:
+                last_error = e
+                continue
+            except self._transport_errors as e:
+                # e.g. a read timeout: the sample may have landed, don't resend
+                self.telemetry.record_failure()
+                raise ApiUnavailable(f"{method} {path} failed: {e}")
+
+            if response.status_code in retry_statuses:
+                last_error = f"HTTP {response.status_code}"
+                continue
+
+            if samples:
+                self.telemetry.record((time.perf_counter() - started) * 1000, len(data or b""), samples)
+            return response
+
+        self.telemetry.record_failure()
+        raise ApiUnavailable(f"{method} {path} failed after {self.max_attempts} attempts: {last_error}")
+
+    def get(self, path, **kwargs):
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request("POST", path, **kwargs)
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
@@ -0,0 +1,98 @@
+import os
+from pathlib import Path
+
+API = os.environ.get("LAGSENSE_API", "https://lagsense-api.onrender.com")
+USER_ID = int(os.environ.get("LAGSENSE_USER_ID", "1"))
+
+# Notification tracking (don't spam)
+NOTIFICATION_LOG_FILE = Path.home() / ".lagsense" / "notifications.json"
+NOTIFICATION_DELAY_MINUTES = 20
+
+GAME_PROCESSES = {
+    "valorant": ["valorant.exe"],
+    "cs2": ["cs2.exe"],
+    "dota2": ["dota2.exe"],
+    "fortnite": ["fortniteclient-win64-shipping.exe"],
+    "discord": ["discord.exe"]
+}
+
+# Sampling rate (Hz) while each game is running; fast-paced shooters get
+# the finest resolution. IDLE_SAMPLE_RATE applies when no game is detected.
+SAMPLE_RATES = {
+    "valorant": 4.0,
+    "cs2": 4.0,
+    "dota2": 2.0,
+    "fortnite": 2.0,
+    "discord": 1.0
+}
+IDLE_SAMPLE_RATE = 0.1
+# Cap while a laptop is on battery
+BATTERY_MAX_SAMPLE_RATE = 1.0
+
+# Game detection: cheap PID re-check while playing, full process scan
+# while idle (multiplied by IDLE_BATTERY_FACTOR on battery)
+ACTIVE_SCAN_INTERVAL = 2
+IDLE_SCAN_INTERVAL = 10
+IDLE_BATTERY_FACTOR = 3
+
+# Packet loss probing interval (seconds); only runs while a game is active
+LOSS_PROBE_INTERVAL = 10
+
+# Game server probing: the game process's remote endpoints are re-read
+# every DISCOVERY_TTL seconds and the top MAX_GAME_ENDPOINTS are pinged
+# SERVER_PROBE_COUNT times every SERVER_PROBE_INTERVAL seconds
+DISCOVERY_TTL = 30
+MAX_GAME_ENDPOINTS = 3
+SERVER_PROBE_INTERVAL = 5
+SERVER_PROBE_COUNT = 4
+
+# Path segments: every tick the default gateway (LAN) and the first public
+# hop (ISP) are probed alongside the remote target, each with a
+# SEGMENT_TIMEOUT second budget. The gateway and ISP hop are looked up
+# again every SEGMENT_TARGETS_TTL seconds; LAGSENSE_GATEWAY,
+# LAGSENSE_ISP_HOP and LAGSENSE_REMOTE pin them instead (e.g. loopback
+# or network-namespace stand-ins). Segment loss covers the last
+# SEGMENT_LOSS_WINDOW probes.
+REMOTE_HOST = os.environ.get("LAGSENSE_REMOTE", "1.1.1.1")
+REMOTE_PORT = int(os.environ.get("LAGSENSE_REMOTE_PORT", "443"))
+GATEWAY = os.environ.get("LAGSENSE_GATEWAY")
+ISP_HOP = os.environ.get("LAGSENSE_ISP_HOP")
+SEGMENT_TIMEOUT = 0.25
+SEGMENT_TARGETS_TTL = 300
+SEGMENT_LOSS_WINDOW = 40
+# Port for TCP probes when ICMP sockets aren't permitted; a closed port
+# still answers with a RST, which is all the timing needs
+SEGMENT_TCP_PORT = 53
+
+# Background traffic: NIC counters are read every tick and the process
+# table every PROCESS_IO_INTERVAL seconds, keeping the TOP_TALKERS of each
+# of the last TALKER_HISTORY scans. A sample whose RTT is SPIKE_FACTOR times
+# the running average and at least SPIKE_MIN_MS above it carries the
+# latest top talkers.
+PROCESS_IO_INTERVAL = 5
+TALKER_HISTORY = 12
+TOP_TALKERS = 3
+SPIKE_FACTOR = 1.5
+SPIKE_MIN_MS = 20
+
+# Upload format: "binary" batches samples into compact frames for
+# POST /stat/batch, "json" posts each sample to /stat. A batch is flushed
+# when it holds BATCH_MAX_SAMPLES or spans BATCH_MAX_SECONDS.
+WIRE_FORMAT = os.environ.get("LAGSENSE_WIRE", "binary")
+BATCH_MAX_SAMPLES = 8
+BATCH_MAX_SECONDS = 2
+
+# How long fetched notification thresholds are reused (seconds), and how
+# often (in uploads) the upload telemetry summary is logged
+THRESHOLDS_TTL = 60
+TELEMETRY_LOG_EVERY = 30
+
+
+def sample_rate_for(game, battery=False):
+    """Sampling rate in Hz for the given game (None = idle)"""
+    if not game:
+        return IDLE_SAMPLE_RATE
+    rate = SAMPLE_RATES.get(game, 1.0)
+    if battery:
+        rate = min(rate, BATTERY_MAX_SAMPLE_RATE)
+    return rate
@@ -0,0 +1,85 @@
+import time
+import socket
+import ipaddress
+from collections import Counter
+
+from .config import DISCOVERY_TTL, MAX_GAME_ENDPOINTS
+
+# Launchers, anti-cheat and telemetry talk HTTPS from inside the game
+# process; game traffic almost never uses these ports
+WEB_PORTS = (80, 443)
+
+
+def _routable(host):
+    try:
+        ip = ipaddress.ip_address(host.split("%")[0])
+    except ValueError:
+        return False
+    return not (ip.is_loopback or ip.is_link_local or ip.is_multicast or ip.is_unspecified)
+
+
+def game_endpoints(pid, limit=MAX_GAME_ENDPOINTS):
+    """Remote (proto, host, port) endpoints of a process's live sockets, most likely game server first
+
+    UDP sockets come before TCP and web ports go last; ties go to the
+    lower address so the order doesn't change between reads. Unconnected
+    UDP sockets have no remote address and can't be seen this way.
+    """
+    import psutil
+
+    try:
+        proc = psutil.Process(pid)
+        # psutil >= 6 renamed connections() to net_connections()
+        list_connections = getattr(proc, "net_connections", None) or proc.connections
+        connections = list_connections(kind="inet")
+    except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+        return []
+
+    counts = Counter()
+    for conn in connections:
+        if not conn.raddr or not _routable(conn.raddr.ip):
+            continue
+        if conn.type == socket.SOCK_STREAM:
+            if conn.status != psutil.CONN_ESTABLISHED:
+                continue
+            proto = "tcp"
+        else:
+            proto = "udp"
+        counts[(proto, conn.raddr.ip, conn.raddr.port)] += 1
+
+    ranked = sorted(counts, key=lambda e: (e[2] in WEB_PORTS, e[0] != "udp", -counts[e], e[1], e[2]))
+    return ranked[:limit]
+
+
+class ServerDiscovery:
+    """Per-process cache of the game's remote endpoints.
+
+    The socket table is only re-read every ``ttl`` seconds, or straight
+    away when the game PID changes (a new session). The first endpoint
+    stays first for as long as the same process still has it open, so
+    the reported server only changes when the old one goes away.
+    """
+
+    def __init__(self, ttl=DISCOVERY_TTL, find_endpoints=game_endpoints):
+        self.ttl = ttl
+        self.pid = None
+        self.endpoints = []
+        self._refreshed_at = None
+        self._find_endpoints = find_endpoints
+
+    def endpoints_for(self, pid):
+        now = time.monotonic()
+        if pid != self.pid or self._refreshed_at is None or now - self._refreshed_at >= self.ttl:
+            endpoints = self._find_endpoints(pid) if pid else []
+            if pid == self.pid and self.endpoints and self.endpoints[0] in endpoints[1:]:
+                endpoints.remove(self.endpoints[0])
+                endpoints.insert(0, self.endpoints[0])
+            self.endpoints = endpoints
+            self.pid = pid
+            self._refreshed_at = now
+        return self.endpoints
+
+    def reset(self):
+        self.pid = None
+        self.endpoints = []
+        self._refreshed_at = None
@@ -0,0 +1,89 @@
+import json
+import subprocess
+from datetime import datetime, timedelta
+
+from .config import NOTIFICATION_LOG_FILE, NOTIFICATION_DELAY_MINUTES
+
+# ---------- NOTIFICATION TRACKING ----------
+def load_notification_log():
+    """Load previous notifications"""
+    try:
+        if NOTIFICATION_LOG_FILE.exists():
+            with open(NOTIFICATION_LOG_FILE, 'r') as f:
+                return json.load(f)
+    except Exception:
+        pass
+    return {}
+
+def save_notification_log(log):
+    """Save notification log"""
+    try:
+        NOTIFICATION_LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
+        with open(NOTIFICATION_LOG_FILE, 'w') as f:
+            json.dump(log, f)
+    except Exception:
+        pass
+
+def can_notify(notification_type, game):
+    """Check if enough time has passed since last notification"""
+    log = load_notification_log()
+    key = f"{notification_type}_{game}"
+    
+    if key not in log:
+        return True
+    
+    last_time = datetime.fromisoformat(log[key])
+    if datetime.now() - last_time > timedelta(minutes=NOTIFICATION_DELAY_MINUTES):
+        return True
+    
+    return False
+
+def record_notification(notification_type, game):
+    """Record that we sent a notification"""
+    log = load_notification_log()
+    key = f"{notification_type}_{game}"
+    log[key] = datetime.now().isoformat()
+    save_notification_log(log)
+
+# ---------- SHOW WINDOWS NOTIFICATION ----------
+def show_windows_notification(title, message, icon_path=None):
+    """Show Windows 10/11 notification"""
+    try:
+        # Use Windows notification
+        from win10toast import ToastNotifier
+        toaster = ToastNotifier()
+        toaster.show_toast(title, message, duration=10, threaded=True)
+    except Exception:
+        try:
+            # Fallback: use PowerShell
+            ps_command = f'[Windows.UI.Notifications.ToastNotificationManager, Windows.UI.Notifications, ContentType = WindowsRuntime] | Out-Null; [Windows.UI.Notifications.ToastNotification, Windows.UI.Notifications, ContentType = WindowsRuntime] | Out-Null; [Windows.Data.Xml.Dom.XmlDocument, Windows.Data.Xml.Dom.XmlDocument, ContentType = WindowsRuntime] | Out-Null; $APP_ID = "LagSense"; $template = @" <toast><visual><binding template="ToastText02"><text id="1">{title}</text><text id="2">{message}</text></binding></visual></toast> "@; $xml = New-Object Windows.Data.Xml.Dom.XmlDocument; $xml.LoadXml($template); $toast = New-Object Windows.UI.Notifications.ToastNotification $xml; [Windows.UI.Notifications.ToastNotificationManager]::CreateToastNotifier($APP_ID).Show($toast) "@'
+            subprocess.run(['powershell', '-Command', ps_command], capture_output=True)
+        except Exception as e:
+            print(f"Notification failed: {e}")
+
+# ---------- SEND NOTIFICATION ----------------
+def check_and_notify(ping, jitter, loss, game, thresholds):
+    """Check if should notify and send notification"""
+    issues = []
+    
+    # Check for issues
+    if ping > thresholds["ping"] * 1.5:  # High threshold for notification
+        if can_notify("high_ping", game):
+            issues.append(f"⚠️ Critical Ping: {ping:.1f}ms")
+            record_notification("high_ping", game)
+    
+    if jitter > thresholds["jitter"] * 1.5:
+        if can_notify("high_jitter", game):
+            issues.append(f"⚠️ High Jitter: {jitter:.2f}ms")
+            record_notification("high_jitter", game)
+    
+    if loss > thresholds["loss"] * 1.5:
+        if can_notify("packet_loss", game):
+            issues.append(f"⚠️ Packet Loss: {loss:.2f}%")
+            record_notification("packet_loss", game)
+    
+    # Send notification if issues found
+    if issues:
+        title = f"LagSense - {game.upper()}"
+        message = "\n".join(issues)
+        show_windows_notification(title, message)
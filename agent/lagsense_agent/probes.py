@@ -0,0 +1,135 @@
+import re
+import sys
+import time
+import socket
+import subprocess
+
+from .config import GAME_PROCESSES
+
+WINDOWS = sys.platform == "win32"
+
+# ---------- TCP LATENCY ----------
+def tcp_latency(host="1.1.1.1", port=443, timeout=1):
+    """Measure TCP latency in milliseconds"""
+    try:
+        start = time.perf_counter()
+        socket.create_connection((host, port), timeout=timeout).close()
+        return round((time.perf_counter() - start) * 1000, 2)
+    except Exception:
+        return None
+
+# ---------- DETECT PACKET LOSS ----------
+def ping_host(host="1.1.1.1", count=10, timeout=1):
+    """Send a batch of pings; returns (sent, received, avg_rtt_ms) or None if ping failed
+
+    avg_rtt_ms is None when no reply came back.
+    """
+    if WINDOWS:
+        cmd = ["ping", "-n", str(count), "-w", str(timeout * 1000), host]
+        received_pattern = r'Received = (\d+)'
+        rtt_pattern = r'Average = (\d+)ms'
+    else:
+        # iputils / BSD ping, so the agent can run headless on Linux
+        cmd = ["ping", "-c", str(count), "-W", str(timeout), host]
+        received_pattern = r'(\d+) (?:packets )?received'
+        rtt_pattern = r'= [\d.]+/([\d.]+)/'
+
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        match = re.search(received_pattern, result.stdout)
+        if match:
+            rtt = re.search(rtt_pattern, result.stdout)
+            return count, int(match.group(1)), float(rtt.group(1)) if rtt else None
+    except Exception:
+        pass
+
+    return None
+
+def probe_packet_loss(host="1.1.1.1", count=10, timeout=1):
+    """Send a batch of pings; returns (sent, received) or None if ping failed"""
+    probe = ping_host(host, count, timeout)
+    return probe[:2] if probe else None
+
+def detect_packet_loss(host="1.1.1.1", count=10, timeout=1):
+    """Detect packet loss using ping"""
+    probe = probe_packet_loss(host, count, timeout)
+    if not probe:
+        return 0
+    sent, received = probe
+    return round(((sent - received) / sent) * 100, 2)
+
+# ---------- GAME SERVER PROBES ----------
+def probe_endpoint(proto, host, port, count=4, timeout=1):
+    """RTT and loss to one game endpoint.
+
+    ICMP first; many game servers drop it, so a TCP endpoint falls back to
+    timing TCP connects to its own port. A UDP endpoint that answers no
+    ping at all has no other probe, so its loss is unmeasured (None)
+    rather than 100%.
+    """
+    rtt, loss = None, None
+    probe = ping_host(host, count, timeout)
+    if probe:
+        sent, received, rtt = probe
+        # Silence is only loss if the endpoint answers pings at all
+        if received:
+            loss = round((sent - received) / sent * 100, 2)
+    if rtt is None and proto == "tcp":
+        times = [t for t in (tcp_latency(host, port, timeout) for _ in range(count)) if t is not None]
+        loss = round((count - len(times)) / count * 100, 2)
+        rtt = round(sum(times) / len(times), 2) if times else None
+    return {"proto": proto, "host": host, "port": port, "rtt": rtt, "loss": loss}
+
+def probe_endpoints(endpoints, count=4, timeout=1):
+    """Probe every (proto, host, port) endpoint concurrently; results keep the input order"""
+    if not endpoints:
+        return []
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=len(endpoints)) as pool:
+        return list(pool.map(lambda e: probe_endpoint(*e, count=count, timeout=timeout), endpoints))
+
+# ---------- DETECT GAME (BACKGROUND) ----------
+def find_game_process():
+    """Find a running game process even if in background; returns (game, pid)"""
+    import psutil
+
+    try:
+        for proc in psutil.process_iter(['name']):
+            try:
+                exe_name = proc.info['name'].lower()
+                for game, names in GAME_PROCESSES.items():
+                    if exe_name in names:
+                        return game, proc.pid
+            except (psutil.NoSuchProcess, psutil.AccessDenied, AttributeError):
+                pass
+    except Exception:
+        pass
+    
+    return None, None
+
+def detect_game_process():
+    """Detect game process even if in background"""
+    return find_game_process()[0]
+
+# ---------- FOREGROUND GAME DETECTION ----------
+def detect_foreground_game():
+    """Detect which game is in foreground (Windows only)"""
+    try:
+        # Optional platform modules: only present on Windows
+        import psutil
+        import win32gui
+        import win32process
+
+        hwnd = win32gui.GetForegroundWindow()
+        _, pid = win32process.GetWindowThreadProcessId(hwnd)
+        proc = psutil.Process(pid)
+        exe = proc.name().lower()
+
+        for game, names in GAME_PROCESSES.items():
+            if exe in names:
+                return game
+    except Exception:
+        pass
+    
+    return None
@@ -0,0 +1,202 @@
+import time
+import queue
+import threading
+from datetime import datetime, timedelta
+
+# How far the derived wall time may stray from the system clock (seconds)
+# before it is re-anchored
+WALL_CLOCK_TOLERANCE = 1.0
+
+# ---------- FIXED-RATE SCHEDULER ----------
+class FixedRateScheduler:
+    """Fire ticks at a fixed cadence on the monotonic clock.
+
+    Deadlines are laid on a grid (start + n * period) instead of
+    "sleep after work", so slow ticks never push later ticks back. When a
+    tick overruns by more than a period the skipped deadlines are counted
+    in ``missed_ticks`` rather than fired in a burst.
+
+    Sample timestamps come from the monotonic clock too, anchored to UTC.
+    Every tick compares that against the system clock and re-anchors when
+    they differ by more than WALL_CLOCK_TOLERANCE: after an NTP step, a
+    manual clock change or a suspend (Linux's monotonic clock stops while
+    asleep). Re-anchors are counted in ``clock_steps``.
+    """
+
+    def __init__(self, rate_hz, clock=time.monotonic, wall_clock=datetime.utcnow):
+        self.period = 1.0 / rate_hz
+        self.ticks = 0
+        self.missed_ticks = 0
+        self.clock_steps = 0
+        self._clock = clock
+        self._wall_clock = wall_clock
+        self._next = None
+        self._rebase = False
+        self._wake = threading.Event()
+        self._stopped = False
+
+        # Anchor monotonic deadlines to wall-clock time, so sample timestamps
+        # stay evenly spaced through small clock adjustments (NTP slewing)
+        self._mono_origin = clock()
+        self._wall_origin = wall_clock()
+
+    def set_rate(self, rate_hz):
+        """Change the tick rate; takes effect from the next tick"""
+        period = 1.0 / rate_hz
+        if period != self.period:
+            self.period = period
+            self._rebase = True
+            self._wake.set()
+
+    def stop(self):
+        """Stop the scheduler and wake a pending wait()"""
+        self._stopped = True
+        self._wake.set()
+
+    @property
+    def stopped(self):
+        return self._stopped
+
+    def wall_time(self, deadline):
+        """Convert a monotonic deadline to a UTC datetime"""
+        return self._wall_origin + timedelta(seconds=deadline - self._mono_origin)
+
+    def _check_anchor(self, now):
+        """Re-anchor wall time to the system clock if the two have drifted apart"""
+        wall = self._wall_clock()
+        if abs((self.wall_time(now) - wall).total_seconds()) > WALL_CLOCK_TOLERANCE:
+            self._mono_origin = now
+            self._wall_origin = wall
+            self.clock_steps += 1
+
+    def wait(self):
+        """Block until the next tick and return its deadline (None once stopped)"""
+        while not self._stopped:
+            now = self._clock()
+            if self._next is None or self._rebase:
+                # First tick, or the rate changed: start a new grid from now
+                # unless the current deadline is already sooner
+                if self._next is None or now + self.period < self._next:
+                    self._next = now
+                self._rebase = False
+
+            delay = self._next - now
+            if delay > 0:
+                self._wake.wait(delay)
+                self._wake.clear()
+                continue
+
+            # Behind schedule: skip whole periods we can no longer honour
+            missed = int(-delay // self.period)
+            if missed:
+                self.missed_ticks += missed
+                self._next += missed * self.period
+
+            deadline = self._next
+            self._next += self.period
+            self.ticks += 1
+            self._check_anchor(now)
+            return deadline
+
+        return None
+
+
+# ---------- BACKGROUND WORKERS ----------
+class PeriodicWorker:
+    """Run a slow function on its own thread and keep its latest result.
+
+    ``interval`` may be a number or a callable returning the current
+    interval; ``when`` is an optional predicate that pauses the work (the
+    worker keeps sleeping) while it returns False.
+    """
+
+    def __init__(self, name, fn, interval, initial=None, on_result=None, when=None):
+        self.name = name
+        self.interval = interval
+        self.latest = initial
+        self.updated_at = None
+        self._fn = fn
+        self._on_result = on_result
+        self._when = when
+        self._stopped = False
+        self._wake = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped = True
+        self._wake.set()
+
+    def wake(self):
+        """Run the next iteration now instead of waiting out the interval"""
+        self._wake.set()
+
+    def _current_interval(self):
+        return self.interval() if callable(self.interval) else self.interval
+
+    def _run(self):
+        while not self._stopped:
+            started = time.monotonic()
+            if self._when is None or self._when():
+                try:
+                    self.latest = self._fn()
+                    self.updated_at = time.monotonic()
+                    if self._on_result:
+                        self._on_result(self.latest)
+                except Exception as e:
+                    print(f"✗ {self.name} failed: {e}")
+            # Fixed cadence here too; a probe that takes longer than the
+            # interval simply runs back to back
+            self._wake.wait(max(0, self._current_interval() - (time.monotonic() - started)))
+            self._wake.clear()
+
+
+class QueueWorker:
+    """Run submitted jobs in order on a single background thread.
+
+    The queue is bounded; when it is full the oldest job is dropped so a
+    slow or offline API can't grow memory without limit.
+    """
+
+    def __init__(self, name, maxsize=256):
+        self.name = name
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def submit(self, fn, *args):
+        while True:
+            try:
+                self._queue.put_nowait((fn, args))
+                return
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def stop(self, timeout=5):
+        """Drain pending jobs (up to timeout seconds) and stop the thread"""
+        try:
+            self._queue.put((None, ()), timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            fn, args = self._queue.get()
+            if fn is None:
+                return
+            try:
+                fn(*args)
+            except Exception as e:
+                print(f"✗ {self.name} job failed: {e}")
@@ -0,0 +1,223 @@
+import os
+import re
+import sys
+import time
+import socket
+import struct
+import itertools
+import ipaddress
+import subprocess
+
+from . import config
+from .config import SEGMENT_TIMEOUT
+from .stats import SegmentStats
+
+WINDOWS = sys.platform == "win32"
+
+ICMP_ECHO_REQUEST = 8
+ICMP_ECHO_REPLY = 0
+
+# Path segments in the order packets cross them
+SEGMENTS = ("lan", "isp", "remote")
+
+
+# ---------- SEGMENT TARGETS ----------
+def default_gateway():
+    """IPv4 default gateway, or None if it can't be determined"""
+    try:
+        if sys.platform.startswith("linux"):
+            with open("/proc/net/route") as f:
+                for line in f.readlines()[1:]:
+                    fields = line.split()
+                    # Destination 0.0.0.0 with the RTF_GATEWAY flag
+                    if fields[1] == "00000000" and int(fields[3], 16) & 0x2:
+                        return socket.inet_ntoa(struct.pack("<L", int(fields[2], 16)))
+            return None
+        if WINDOWS:
+            out = subprocess.run(["route", "print", "-4", "0.0.0.0"], capture_output=True, text=True).stdout
+            match = re.search(r"^\s*0\.0\.0\.0\s+0\.0\.0\.0\s+(\d+\.\d+\.\d+\.\d+)", out, re.M)
+        else:
+            out = subprocess.run(["route", "-n", "get", "default"], capture_output=True, text=True).stdout
+            match = re.search(r"gateway:\s*(\d+\.\d+\.\d+\.\d+)", out)
+        return match.group(1) if match else None
+    except Exception:
+        return None
+
+
+def _is_public(host):
+    try:
+        ip = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    # 100.64.0.0/10 is carrier-grade NAT: still inside the ISP, keep looking
+    return ip.is_global
+
+
+def first_isp_hop(target, max_hops=6):
+    """First public router on the path to ``target`` (traceroute), or None"""
+    if WINDOWS:
+        cmd = ["tracert", "-d", "-h", str(max_hops), "-w", "500", target]
+    else:
+        cmd = ["traceroute", "-n", "-q", "1", "-w", "1", "-m", str(max_hops), target]
+    try:
+        out = subprocess.run(cmd, capture_output=True, text=True, timeout=max_hops * 3).stdout
+    except Exception:
+        return None
+
+    for line in out.splitlines()[1:]:
+        hops = re.findall(r"\b(\d+\.\d+\.\d+\.\d+)\b", line)
+        if hops and hops[-1] != target and _is_public(hops[-1]):
+            return hops[-1]
+    return None
+
+
+# ---------- PROBES ----------
+def _checksum(data):
+    if len(data) % 2:
+        data += b"\0"
+    total = sum(struct.unpack(f"!{len(data) // 2}H", data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+
+class IcmpProbe:
+    """Single ICMP echo per call.
+
+    Uses an unprivileged ICMP datagram socket where the OS allows it
+    (Linux ping_group_range, macOS), otherwise a raw socket (root /
+    administrator). ``available`` is False when neither can be opened.
+    """
+
+    def __init__(self):
+        # itertools.count is safe to share between probe threads
+        self._seq = itertools.count(1)
+        self._ident = os.getpid() & 0xFFFF
+        self.kind = None
+        for kind in (socket.SOCK_DGRAM, socket.SOCK_RAW):
+            try:
+                socket.socket(socket.AF_INET, kind, socket.IPPROTO_ICMP).close()
+                self.kind = kind
+                break
+            except OSError:
+                continue
+
+    @property
+    def available(self):
+        return self.kind is not None
+
+    def rtt(self, host, timeout=SEGMENT_TIMEOUT):
+        """Round trip in ms, or None on timeout"""
+        seq = next(self._seq) & 0xFFFF
+        header = struct.pack("!BBHHH", ICMP_ECHO_REQUEST, 0, 0, self._ident, seq)
+        payload = b"lagsense"
+        packet = struct.pack("!BBHHH", ICMP_ECHO_REQUEST, 0, _checksum(header + payload), self._ident, seq) + payload
+
+        with socket.socket(socket.AF_INET, self.kind, socket.IPPROTO_ICMP) as sock:
+            sock.settimeout(timeout)
+            deadline = time.perf_counter() + timeout
+            start = time.perf_counter()
+            try:
+                sock.sendto(packet, (host, 0))
+                while True:
+                    data, _ = sock.recvfrom(1024)
+                    elapsed = time.perf_counter() - start
+                    # Raw sockets (and macOS datagram ones) include the IP header
+                    if data and data[0] >> 4 == 4 and len(data) >= 20 + 8:
+                        data = data[(data[0] & 0x0F) * 4:]
+                    kind, _, _, ident, reply_seq = struct.unpack("!BBHHH", data[:8])
+                    # A raw socket sees every echo reply on the host; datagram
+                    # sockets get only their own, with the kernel's ident
+                    ours = self.kind != socket.SOCK_RAW or ident == self._ident
+                    if kind == ICMP_ECHO_REPLY and reply_seq == seq and ours:
+                        return round(elapsed * 1000, 2)
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        return None
+                    sock.settimeout(remaining)
+            except OSError:
+                return None
+
+
+def tcp_rtt(host, port, timeout=SEGMENT_TIMEOUT):
+    """Round trip of a TCP connect in ms; a refusal (RST) is an answer too"""
+    start = time.perf_counter()
+    try:
+        socket.create_connection((host, port), timeout=timeout).close()
+    except ConnectionRefusedError:
+        pass
+    except OSError:
+        return None
+    return round((time.perf_counter() - start) * 1000, 2)
+
+
+# ---------- SEGMENT PROBER ----------
+class SegmentProber:
+    """Per-tick RTT to the gateway (LAN), first ISP hop (ISP) and remote target.
+
+    The LAN and ISP probes run on a small persistent pool while the tick
+    thread times the remote target itself, so all three see the same
+    instant and a tick costs one probe timeout, not three. Targets come
+    from ``refresh_targets`` (the routing table and a short traceroute),
+    which is slow and meant for a background worker; until it has run,
+    only the remote segment is measured.
+    """
+
+    def __init__(self, gateway=config.GATEWAY, isp_hop=config.ISP_HOP,
+                 timeout=SEGMENT_TIMEOUT, window=config.SEGMENT_LOSS_WINDOW):
+        self.timeout = timeout
+        self.pinned = {"lan": gateway, "isp": isp_hop}
+        self.targets = {"lan": gateway, "isp": isp_hop}
+        self.stats = {name: SegmentStats(window) for name in SEGMENTS}
+        self._icmp = None
+        self._pool = None
+
+    def refresh_targets(self, remote=config.REMOTE_HOST):
+        """Look up the gateway and first ISP hop (unless pinned); returns the targets"""
+        self.targets = {
+            "lan": self.pinned["lan"] or default_gateway(),
+            "isp": self.pinned["isp"] or first_isp_hop(remote),
+        }
+        return self.targets
+
+    def probe(self, host):
+        """One echo to ``host``: ICMP when the OS lets us, otherwise a TCP connect"""
+        if self._icmp is None:
+            self._icmp = IcmpProbe()
+        if self._icmp.available:
+            return self._icmp.rtt(host, self.timeout)
+        return tcp_rtt(host, config.SEGMENT_TCP_PORT, self.timeout)
+
+    def measure(self, remote_probe):
+        """Probe every segment concurrently with ``remote_probe()``; returns its RTT"""
+        targets = [(name, host) for name, host in self.targets.items() if host]
+        if targets and self._pool is None:
+            from concurrent.futures import ThreadPoolExecutor
+            self._pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="segment-probe")
+        futures = [(name, self._pool.submit(self.probe, host)) for name, host in targets]
+
+        remote = remote_probe()
+        self.stats["remote"].add(remote)
+        for name, future in futures:
+            rtt = future.result()
+            # Without ICMP the probe is a TCP connect to a port home routers
+            # and ISP hops rarely listen on: a timeout there is not loss
+            self.stats[name].add(rtt, measured=rtt is not None or self._icmp.available)
+        return remote
+
+    def snapshot(self):
+        """Per-segment fields for the /stat payload (segments without a target are left out)"""
+        return {
+            name: self.stats[name].snapshot()
+            for name in SEGMENTS
+            if name == "remote" or self.targets.get(name)
+        }
+
+    def reset(self):
+        for tracker in self.stats.values():
+            tracker.reset()
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
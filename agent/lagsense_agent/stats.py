@@ -0,0 +1,255 @@
+# ---------- JITTER (RFC 3550) ----------
+class Rfc3550Jitter:
+    """Interarrival jitter as defined in RFC 3550 section 6.4.1.
+
+    J += (|D| - J) / 16, where D is the change in transit time between two
+    consecutive samples; for round-trip probes that is the RTT difference.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.value = 0.0
+        self._last = None
+
+    def update(self, rtt):
+        if self._last is not None:
+            self.value += (abs(rtt - self._last) - self.value) / 16.0
+        self._last = rtt
+        return self.value
+
+
+# ---------- RTT AVERAGES ----------
+class Ewma:
+    """Exponentially weighted moving average"""
+
+    def __init__(self, alpha=0.125):
+        self.alpha = alpha
+        self.reset()
+
+    def reset(self):
+        self.value = None
+
+    def update(self, x):
+        if self.value is None:
+            self.value = x
+        else:
+            self.value += self.alpha * (x - self.value)
+        return self.value
+
+
+class SlidingMean:
+    """Mean over the last ``size`` samples using a ring buffer and running sum"""
+
+    def __init__(self, size=20):
+        self.size = size
+        self._buf = [0.0] * size
+        self.reset()
+
+    def reset(self):
+        self._pos = 0
+        self._count = 0
+        self._sum = 0.0
+
+    def update(self, x):
+        if self._count == self.size:
+            self._sum -= self._buf[self._pos]
+        else:
+            self._count += 1
+        self._buf[self._pos] = x
+        self._sum += x
+        self._pos = (self._pos + 1) % self.size
+        return self.value
+
+    @property
+    def value(self):
+        return self._sum / self._count if self._count else 0.0
+
+
+# ---------- PERCENTILES (P²) ----------
+class P2Quantile:
+    """Streaming quantile estimate using the P² algorithm (Jain & Chlamtac, 1985).
+
+    Keeps five markers regardless of how many samples have been seen.
+    """
+
+    def __init__(self, p):
+        self.p = p
+        self._q = [0.0] * 5
+        self._n = [0] * 5
+        self._np = [0.0] * 5
+        self._dn = [0.0, p / 2, p, (1 + p) / 2, 1.0]
+        self.reset()
+
+    def reset(self):
+        p = self.p
+        self.count = 0
+        for i in range(5):
+            self._n[i] = i
+        self._np[:] = (0.0, 2 * p, 4 * p, 2 + 2 * p, 4.0)
+
+    def update(self, x):
+        q, n, np_ = self._q, self._n, self._np
+
+        if self.count < 5:
+            q[self.count] = x
+            self.count += 1
+            if self.count == 5:
+                q.sort()
+            return
+
+        self.count += 1
+
+        # Find the cell k with q[k] <= x < q[k + 1], extending the extremes
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= q[k + 1]:
+                k += 1
+
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            np_[i] += self._dn[i]
+
+        # Nudge the three middle markers toward their desired positions
+        for i in range(1, 4):
+            d = np_[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                qp = q[i] + d / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+                    + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+                )
+                if not q[i - 1] < qp < q[i + 1]:
+                    # Parabolic step would break marker order; fall back to linear
+                    qp = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                q[i] = qp
+                n[i] += d
+
+    @property
+    def value(self):
+        if self.count >= 5:
+            return self._q[2]
+        if self.count == 0:
+            return 0.0
+        # Too few samples for markers yet: exact quantile of what we have
+        head = sorted(self._q[:self.count])
+        return head[int(round(self.p * (self.count - 1)))]
+
+
+# ---------- PACKET LOSS ----------
+class LossWindow:
+    """Packet loss percentage over the last ``size`` probe batches"""
+
+    def __init__(self, size=6):
+        self.size = size
+        self._sent = [0] * size
+        self._received = [0] * size
+        self.reset()
+
+    def reset(self):
+        self._pos = 0
+        self._count = 0
+        self.sent = 0
+        self.received = 0
+
+    def update(self, sent, received):
+        if self._count == self.size:
+            self.sent -= self._sent[self._pos]
+            self.received -= self._received[self._pos]
+        else:
+            self._count += 1
+        self._sent[self._pos] = sent
+        self._received[self._pos] = received
+        self.sent += sent
+        self.received += received
+        self._pos = (self._pos + 1) % self.size
+        return self.value
+
+    @property
+    def value(self):
+        if not self.sent:
+            return 0.0
+        return (self.sent - self.received) / self.sent * 100
+
+
+# ---------- PATH SEGMENTS ----------
+class SegmentStats:
+    """RTT, jitter and loss for one path segment, fed one probe per tick"""
+
+    def __init__(self, window=40):
+        self.jitter = Rfc3550Jitter()
+        self.loss = LossWindow(window)
+        self.rtt = None
+
+    def reset(self):
+        self.jitter.reset()
+        self.loss.reset()
+        self.rtt = None
+
+    def add(self, rtt, measured=True):
+        """Record one probe; ``rtt`` is None when it went unanswered
+
+        An unanswered probe that says nothing about the path
+        (``measured=False``) is kept out of the loss window.
+        """
+        self.rtt = rtt
+        if not measured:
+            return
+        self.loss.update(1, 0 if rtt is None else 1)
+        if rtt is not None:
+            self.jitter.update(rtt)
+
+    def snapshot(self):
+        # None = nothing measured in the window yet
+        measured = self.loss.sent > 0
+        return {
+            "rtt": self.rtt,
+            "jitter": round(self.jitter.value, 2) if measured else None,
+            "loss": round(self.loss.value, 2) if measured else None
+        }
+
+
+# ---------- SESSION AGGREGATE ----------
+class SessionStats:
+    """All per-session trackers, fed one RTT sample at a time"""
+
+    def __init__(self, window=20):
+        self.jitter = Rfc3550Jitter()
+        self.ewma = Ewma()
+        self.mean = SlidingMean(window)
+        self.p50 = P2Quantile(0.5)
+        self.p95 = P2Quantile(0.95)
+        self.loss = LossWindow()
+
+    def reset(self):
+        for tracker in (self.jitter, self.ewma, self.mean, self.p50, self.p95, self.loss):
+            tracker.reset()
+
+    def add_rtt(self, rtt):
+        self.jitter.update(rtt)
+        self.ewma.update(rtt)
+        self.mean.update(rtt)
+        self.p50.update(rtt)
+        self.p95.update(rtt)
+
+    def add_loss(self, sent, received):
+        self.loss.update(sent, received)
+
+    def snapshot(self):
+        """Fields for the /stat payload"""
+        return {
+            "jitter": round(self.jitter.value, 2),
+            "ping_ewma": round(self.ewma.value or 0.0, 2),
+            "ping_mean": round(self.mean.value, 2),
+            "ping_p50": round(self.p50.value, 2),
+            "ping_p95": round(self.p95.value, 2),
+            "loss_window": round(self.loss.value, 2)
+        }
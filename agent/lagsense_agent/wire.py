@@ -0,0 +1,87 @@
+import zlib
+import struct
+from datetime import datetime
+
+# Binary sample framing understood by the backend's POST /stat/batch
+# (backend/wire.py documents the layout). Pure struct, no NumPy.
+
+CONTENT_TYPE = "application/vnd.lagsense.samples"
+
+MAGIC = b"LSW1"
+VERSION = 1
+FLAG_EXTENDED = 0x01
+FLAG_SERVER = 0x02
+FLAG_SEGMENTS = 0x04
+FLAG_MEAN = 0x08
+
+HEADER = struct.Struct("<4sBBIdIB")
+RECORD = struct.Struct("<Ifff")
+EXTENDED_RECORD = struct.Struct("<Ifffffff")
+SERVER_FIELDS = struct.Struct("<ff")
+# rtt, jitter, loss for each of lan, isp, remote
+SEGMENT_FIELDS = struct.Struct("<fffffffff")
+MEAN_FIELDS = struct.Struct("<f")
+SEGMENTS = ("lan", "isp", "remote")
+NAN = float("nan")
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def encode_frame(user_id, game, samples, compress_min_bytes=512):
+    """Pack payload dicts for one session into a frame; returns (body, content_encoding)
+
+    Frames of at least ``compress_min_bytes`` are deflate-compressed; small
+    ones aren't worth the CPU.
+    """
+    timestamps = [(datetime.fromisoformat(s["timestamp"]) - EPOCH).total_seconds() for s in samples]
+    base_ts = timestamps[0]
+    game_bytes = game.encode("utf-8")[:255]
+
+    extended = all("ping_p95" in s for s in samples)
+    # One frame describes one server; the agent flushes batches when it changes
+    server = samples[0].get("server")
+    segments = all("segments" in s for s in samples)
+    mean = all("ping_mean" in s for s in samples)
+    flags = (
+        (FLAG_EXTENDED if extended else 0)
+        | (FLAG_SERVER if server else 0)
+        | (FLAG_SEGMENTS if segments else 0)
+        | (FLAG_MEAN if mean else 0)
+    )
+    parts = [
+        HEADER.pack(MAGIC, VERSION, flags, user_id, base_ts, len(samples), len(game_bytes)),
+        game_bytes,
+    ]
+    if server:
+        server_bytes = server.encode("utf-8")[:255]
+        parts += [bytes([len(server_bytes)]), server_bytes]
+
+    for ts, s in zip(timestamps, samples):
+        dt_ms = int(round((ts - base_ts) * 1000))
+        if extended:
+            parts.append(EXTENDED_RECORD.pack(
+                dt_ms, s["ping"], s["jitter"], s["loss"],
+                s["ping_ewma"], s["ping_p50"], s["ping_p95"], s["loss_window"]
+            ))
+        else:
+            parts.append(RECORD.pack(dt_ms, s["ping"], s["jitter"], s["loss"]))
+        if server:
+            # NaN = no reply from the server in the last probe
+            parts.append(SERVER_FIELDS.pack(
+                NAN if s.get("server_rtt") is None else s["server_rtt"],
+                NAN if s.get("server_loss") is None else s["server_loss"]
+            ))
+        if segments:
+            # NaN = segment not measured (no target) or probe unanswered
+            values = []
+            for name in SEGMENTS:
+                segment = s["segments"].get(name) or {}
+                values += [NAN if segment.get(f) is None else segment[f] for f in ("rtt", "jitter", "loss")]
+            parts.append(SEGMENT_FIELDS.pack(*values))
+        if mean:
+            parts.append(MEAN_FIELDS.pack(s["ping_mean"]))
+
+    body = b"".join(parts)
+    if compress_min_bytes is not None and len(body) >= compress_min_bytes:
+        return zlib.compress(body, 6), "deflate"
+    return body, None
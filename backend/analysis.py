@@ -0,0 +1,223 @@
+import json
+from datetime import datetime
+from typing import Optional
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from database import Session as DBSession, NetworkStat
+import settings
+
+VERDICTS = ["Good", "Average", "Bad"]
+
+# Path segments in the order packets cross them, what the agent probes at
+# the end of each and how reasons name them
+SEGMENTS = ("lan", "isp", "remote")
+SEGMENT_HOPS = {"lan": "gateway", "isp": "first ISP hop", "remote": "remote target"}
+SEGMENT_LABELS = {
+    "lan": "your local network (router / Wi-Fi)",
+    "isp": "your ISP's network",
+    "remote": "the route beyond your ISP or the game server"
+}
+# A process is only blamed for spikes when it moved at least this many
+# kbit/s (its I/O also counts disk, so small rates prove nothing)
+TALKER_MIN_KBPS = 500
+
+
+def score(avg_ping: float, avg_jitter: float, avg_loss: float, thresholds: dict):
+    """Verdict and whether the optimizer is worth suggesting, from session averages"""
+    exceeded = sum([
+        avg_ping > thresholds["ping"],
+        avg_jitter > thresholds["jitter"],
+        avg_loss > thresholds["loss"]
+    ])
+    verdict = VERDICTS[min(exceeded, 2)]
+    optimizer = avg_jitter > thresholds["jitter"] or avg_loss > thresholds["loss"]
+    return verdict, optimizer
+
+
+def score_many(avg_ping, avg_jitter, avg_loss, ping_limit, jitter_limit, loss_limit) -> np.ndarray:
+    """Vectorized ``score`` verdicts: one verdict per row of equal-length arrays"""
+    exceeded = (
+        (np.asarray(avg_ping) > ping_limit).astype(np.int8)
+        + (np.asarray(avg_jitter) > jitter_limit)
+        + (np.asarray(avg_loss) > loss_limit)
+    )
+    return np.array(VERDICTS, dtype=object)[np.minimum(exceeded, 2)]
+
+
+def reasons(avg_ping: float, avg_jitter: float, avg_loss: float, ping_range: float, thresholds: dict,
+            attribution: Optional[dict] = None, talkers: Optional[dict] = None) -> list:
+    """Human-readable causes behind a verdict; a measured segment attribution comes first"""
+    found = []
+    if attribution and attribution["cause"]:
+        found.append(f"Traced to {SEGMENT_LABELS[attribution['cause']]} – {attribution['evidence'][0]}")
+    if avg_ping > thresholds["ping"] and avg_jitter <= thresholds["jitter"]:
+        found.append("High base latency – distant servers or inefficient ISP routing")
+    if avg_jitter > thresholds["jitter"]:
+        found.append("High jitter – unstable routing or Wi-Fi interference")
+    if avg_loss > thresholds["loss"]:
+        found.append("Packet loss detected – ISP congestion or poor routing")
+    if ping_range > thresholds["ping"]:
+        if talkers and talkers["processes"]:
+            top = talkers["processes"][0]
+            if top["source"] == "tcp":
+                activity = f"was moving {top['avg_kbps'] / 1000:.1f} Mbit/s"
+            else:
+                activity = f"was doing {top['avg_kbps'] / 1000:.1f} Mbit/s of disk/network I/O"
+            found.append(f"Ping spikes – {top['name']} {activity} "
+                         f"during {top['spikes']} of {talkers['spikes']} spikes")
+        else:
+            found.append("Ping spikes – background downloads or wireless drops")
+    if not found:
+        found.append("No major network issues detected")
+    return found
+
+
+def spike_talkers(summaries: list) -> Optional[dict]:
+    """Processes that were busiest when the RTT spiked, most frequent first
+
+    ``summaries`` are the stored top_talkers JSON of a session's spike
+    samples. Each spike counts toward its single busiest process. A
+    process's ``source`` is "tcp" only if all its figures came from socket
+    counters; anything else (I/O counters, older agents) is "io".
+    """
+    if not summaries:
+        return None
+
+    processes = {}
+    for raw in summaries:
+        try:
+            summary = json.loads(raw)
+        except ValueError:
+            continue
+        top = summary.get("top") or []
+        if not top or top[0]["kbps"] < TALKER_MIN_KBPS:
+            continue
+        source = "tcp" if summary.get("source") == "tcp" else "io"
+        entry = processes.setdefault(top[0]["name"], {"name": top[0]["name"], "spikes": 0, "kbps": [],
+                                                      "source": source})
+        entry["spikes"] += 1
+        entry["kbps"].append(top[0]["kbps"])
+        if source != "tcp":
+            entry["source"] = "io"
+
+    ranked = sorted(processes.values(), key=lambda p: (p["spikes"], max(p["kbps"])), reverse=True)
+    return {
+        "spikes": len(summaries),
+        "processes": [
+            {
+                "name": p["name"],
+                "source": p["source"],
+                "spikes": p["spikes"],
+                "avg_kbps": round(sum(p["kbps"]) / len(p["kbps"]), 1),
+                "max_kbps": round(max(p["kbps"]), 1)
+            }
+            for p in ranked
+        ]
+    }
+
+
+def _nanmean(values: np.ndarray) -> Optional[float]:
+    finite = values[np.isfinite(values)]
+    return round(float(finite.mean()), 2) if len(finite) else None
+
+
+def attribute_segments(segment_rows: dict, thresholds: dict) -> Optional[dict]:
+    """Which path segment (LAN, ISP, remote) degradation starts on, with the evidence
+
+    ``segment_rows`` maps each segment to its (rtt, jitter, loss) sample
+    arrays, NaN where it wasn't measured. Segments are nested: every probe
+    past the gateway also crosses the LAN. So loss or jitter is blamed on
+    the nearest segment that shows it, but only when it carries through to
+    the remote target; routers often deprioritize probes addressed to
+    themselves, and that alone is not degradation. Latency is blamed on the
+    segment that adds the most round trip. None when fewer than two
+    segments were measured.
+    """
+    summary = {}
+    for name in SEGMENTS:
+        if name not in segment_rows:
+            continue
+        rtt, jitter, loss = (np.asarray(values, dtype=np.float64) for values in segment_rows[name])
+        measured = np.isfinite(rtt) | np.isfinite(loss)
+        if measured.any():
+            summary[name] = {
+                "samples": int(measured.sum()),
+                "avg_rtt": _nanmean(rtt),
+                "avg_jitter": _nanmean(jitter),
+                "avg_loss": _nanmean(loss)
+            }
+    if "remote" not in summary or len(summary) < 2:
+        return None
+
+    order = [name for name in SEGMENTS if name in summary]
+    remote = summary["remote"]
+    findings = []
+
+    for metric, limit, what, unit in (
+        ("avg_loss", thresholds["loss"], "Packet loss", "%"),
+        ("avg_jitter", thresholds["jitter"], "Jitter", " ms")
+    ):
+        if remote[metric] is None or remote[metric] <= limit:
+            continue
+        for i, name in enumerate(order):
+            value = summary[name][metric]
+            if value is None or value <= limit:
+                continue
+            if name != "remote":
+                evidence = (f"{what} starts at the {SEGMENT_HOPS[name]}: {value:.1f}{unit} there, "
+                            f"{remote[metric]:.1f}{unit} to the remote target")
+            else:
+                before = order[i - 1]
+                evidence = (f"{what} appears past the {SEGMENT_HOPS[before]}: {value:.1f}{unit} to the remote target, "
+                            f"{summary[before][metric] or 0:.1f}{unit} to the {SEGMENT_HOPS[before]}")
+            findings.append((name, evidence))
+            break
+
+    if remote["avg_rtt"] is not None and remote["avg_rtt"] > thresholds["ping"]:
+        added, previous = {}, 0.0
+        for name in order:
+            rtt = summary[name]["avg_rtt"]
+            if rtt is not None:
+                added[name] = max(rtt - previous, 0.0)
+                previous = rtt
+        name = max(added, key=added.get)
+        findings.append((name, f"{added[name]:.0f} of {remote['avg_rtt']:.0f} ms round trip "
+                               f"is added on {SEGMENT_LABELS[name]}"))
+
+    return {
+        "cause": findings[0][0] if findings else None,
+        "evidence": [evidence for _, evidence in findings],
+        "segments": summary
+    }
+
+
+def finalize_session(db: Session, db_session: DBSession, end_time: datetime = None) -> DBSession:
+    """End-of-session pipeline: close the session, recompute its aggregates and verdict.
+
+    ``end_time`` defaults to the last sample's timestamp (or the start time
+    for a session without samples). The caller commits; nothing here
+    commits, so it can run inside the ingest writer's batch transaction.
+    """
+    thresholds = settings.find_game_threshold(db, db_session.user_id, db_session.game)
+
+    count, avg_ping, avg_jitter, avg_loss, last_sample = db.query(
+        func.count(NetworkStat.id),
+        func.avg(NetworkStat.ping),
+        func.avg(NetworkStat.jitter),
+        func.avg(NetworkStat.packet_loss),
+        func.max(NetworkStat.timestamp)
+    ).filter(NetworkStat.session_id == db_session.id).one()
+
+    end_time = end_time or last_sample or db_session.start_time
+    # Agent clocks can run behind the server's; never end before the start
+    db_session.end_time = max(end_time, db_session.start_time)
+    db_session.sample_count = count
+    if count:
+        db_session.avg_ping = avg_ping
+        db_session.avg_jitter = avg_jitter
+        db_session.avg_loss = avg_loss
+        db_session.verdict, _ = score(avg_ping, avg_jitter, avg_loss, thresholds)
+    return db_session
@@ -0,0 +1,205 @@
+import os
+import json
+import asyncio
+import threading
+from datetime import datetime
+
+from sqlalchemy import delete, insert
+
+from database import AnomalyEvent, AnomalyState, Session as DBSession
+
+# Enter an anomaly above ANOMALY_Z standard deviations from the baseline,
+# leave it again below ANOMALY_CLEAR_Z (hysteresis keeps one spike = one event)
+ANOMALY_Z = float(os.environ.get("LAGSENSE_ANOMALY_Z", "4.0"))
+ANOMALY_CLEAR_Z = 2.0
+# EWMA weight of each new sample, and samples needed before a baseline is trusted
+ANOMALY_ALPHA = 0.05
+ANOMALY_WARMUP = 20
+# Smallest deviation treated as meaningful per metric, so a flat baseline
+# (e.g. 0% loss) doesn't turn every wiggle into infinite z
+STD_FLOOR = {"ping": 2.0, "jitter": 1.0, "loss": 1.0}
+# How often detector state is written to anomaly_state (seconds)
+SNAPSHOT_INTERVAL = 30
+
+METRICS = (("ping", "ping"), ("jitter", "jitter"), ("loss", "packet_loss"))
+
+
+class MetricDetector:
+    """EWMA mean/variance baseline with a z-score trigger; O(1) state"""
+
+    __slots__ = ("n", "mean", "var", "active")
+
+    def __init__(self, n=0, mean=0.0, var=0.0, active=False):
+        self.n = n
+        self.mean = mean
+        self.var = var
+        self.active = active
+
+    def update(self, value, floor):
+        """Fold in one sample; returns (z, baseline) when it starts an anomaly, else None"""
+        fired = None
+        if self.n >= ANOMALY_WARMUP:
+            z = (value - self.mean) / max(self.var ** 0.5, floor)
+            if not self.active and z > ANOMALY_Z:
+                self.active = True
+                fired = (z, self.mean)
+            elif self.active and z < ANOMALY_CLEAR_Z:
+                self.active = False
+
+        if self.n == 0:
+            self.mean = value
+        else:
+            diff = value - self.mean
+            step = ANOMALY_ALPHA * diff
+            self.mean += step
+            self.var = (1 - ANOMALY_ALPHA) * (self.var + diff * step)
+        self.n += 1
+        return fired
+
+    def to_list(self):
+        return [self.n, self.mean, self.var, self.active]
+
+
+class SessionDetector:
+    """Detectors for one session's ping, jitter and loss"""
+
+    __slots__ = ("user_id", "game", "metrics")
+
+    def __init__(self, user_id, game, metrics=None):
+        self.user_id = user_id
+        self.game = game
+        self.metrics = metrics or {name: MetricDetector() for name, _ in METRICS}
+
+    def update(self, session_id, row):
+        events = []
+        for name, column in METRICS:
+            fired = self.metrics[name].update(row[column], STD_FLOOR[name])
+            if fired:
+                z, baseline = fired
+                events.append({
+                    "session_id": session_id,
+                    "user_id": self.user_id,
+                    "game": self.game,
+                    "metric": name,
+                    "value": row[column],
+                    "baseline": round(baseline, 3),
+                    "zscore": round(z, 2),
+                    "timestamp": row["timestamp"]
+                })
+        return events
+
+    def to_json(self):
+        return json.dumps({name: m.to_list() for name, m in self.metrics.items()})
+
+    @classmethod
+    def from_json(cls, user_id, game, state):
+        data = json.loads(state)
+        return cls(user_id, game, {name: MetricDetector(*data[name]) for name, _ in METRICS})
+
+
+class AnomalyDetector:
+    """Streaming per-session anomaly detection for one ingest writer.
+
+    ``process`` runs inside the ingest writer for every batch. State is
+    only touched under the ingest queue's ``write_lock``, so the detectors
+    themselves need no locking. Events are written to
+    anomaly_events in the batch's transaction and, once committed,
+    pushed to live subscribers. State is snapshotted to anomaly_state
+    every SNAPSHOT_INTERVAL seconds and restored on start, so a restart
+    doesn't send every baseline back through warm-up.
+    """
+
+    def __init__(self, snapshot_interval=SNAPSHOT_INTERVAL):
+        self.snapshot_interval = snapshot_interval
+        self.events_emitted = 0
+        self._sessions = {}
+        self._forgotten = set()
+        self._subscribers = {}
+        self._sub_lock = threading.Lock()
+        self._last_snapshot = None
+
+    # ---------- WRITER SIDE ----------
+    def process(self, session_id, user_id, game, rows):
+        """Run a batch of one session's rows through its detector; returns new events"""
+        detector = self._sessions.get(session_id)
+        if detector is None:
+            detector = self._sessions[session_id] = SessionDetector(user_id, game)
+        events = []
+        for row in rows:
+            events.extend(detector.update(session_id, row))
+        return events
+
+    def record(self, db, events):
+        """Add events to the open transaction"""
+        if events:
+            db.execute(insert(AnomalyEvent), events)
+
+    def forget(self, session_id):
+        """Drop a closed session's state"""
+        if self._sessions.pop(session_id, None) is not None:
+            self._forgotten.add(session_id)
+
+    def restore(self, db):
+        """Load snapshotted state for sessions that are still open"""
+        rows = db.query(AnomalyState.session_id, DBSession.user_id, DBSession.game, AnomalyState.state).join(
+            DBSession, DBSession.id == AnomalyState.session_id
+        ).filter(DBSession.end_time == None).all()
+        for session_id, user_id, game, state in rows:
+            self._sessions[session_id] = SessionDetector.from_json(user_id, game, state)
+        self._last_snapshot = datetime.utcnow()
+        return len(rows)
+
+    def snapshot_due(self, now):
+        if self._last_snapshot is None:
+            self._last_snapshot = now
+        return (now - self._last_snapshot).total_seconds() >= self.snapshot_interval
+
+    def snapshot(self, db):
+        """Replace the stored state with the in-memory one (caller commits)"""
+        now = datetime.utcnow()
+        # Set first so a failing snapshot is retried next interval, not next tick
+        self._last_snapshot = now
+        stale = self._forgotten | set(self._sessions)
+        if stale:
+            db.execute(delete(AnomalyState).where(AnomalyState.session_id.in_(stale)))
+        if self._sessions:
+            db.execute(insert(AnomalyState), [
+                {"session_id": session_id, "state": detector.to_json(), "updated_at": now}
+                for session_id, detector in self._sessions.items()
+            ])
+        self._forgotten.clear()
+
+    # ---------- LIVE SUBSCRIBERS ----------
+    def subscribe(self, user_id, loop, queue):
+        """Deliver the user's events to an asyncio queue on ``loop``"""
+        with self._sub_lock:
+            self._subscribers.setdefault(user_id, set()).add((loop, queue))
+
+    def unsubscribe(self, user_id, loop, queue):
+        with self._sub_lock:
+            subscribers = self._subscribers.get(user_id)
+            if subscribers:
+                subscribers.discard((loop, queue))
+                if not subscribers:
+                    del self._subscribers[user_id]
+
+    def publish(self, events):
+        """Push committed events to subscribers (called from the writer thread)"""
+        self.events_emitted += len(events)
+        with self._sub_lock:
+            targets = [(event, list(self._subscribers.get(event["user_id"], ()))) for event in events]
+        for event, subscribers in targets:
+            for loop, queue in subscribers:
+                try:
+                    loop.call_soon_threadsafe(_offer, queue, event)
+                except RuntimeError:
+                    # Loop already closed; the subscriber is going away
+                    pass
+
+
+def _offer(queue, event):
+    """Runs on the subscriber's loop; a subscriber that can't keep up loses events"""
+    try:
+        queue.put_nowait(event)
+    except asyncio.QueueFull:
+        pass
@@ -1,22 +1,88 @@
+from concurrent.futures import ProcessPoolExecutor
 from passlib.context import CryptContext
 from sqlalchemy.orm import Session
 from database import User
+import multiprocessing
+import threading
+import os
 
 # Use argon2 instead of bcrypt to avoid the 72-byte limit
 pwd_context = CryptContext(schemes=["argon2", "bcrypt"], deprecated="auto")
 
-def hash_password(password: str) -> str:
-    """Hash password using argon2 (no 72-byte limit like bcrypt)"""
+# ================= PASSWORD POOL =================
+# argon2 is deliberately CPU and memory hungry. It runs in a small process
+# pool so a burst of logins can't starve the request threads serving /stat
+# of CPU or the GIL. At most PASSWORD_WORKERS hashes run at once and
+# PASSWORD_QUEUE_DEPTH more may wait; beyond that requests are refused.
+PASSWORD_WORKERS = int(os.environ.get("LAGSENSE_PASSWORD_WORKERS", str(min(2, os.cpu_count() or 1))))
+PASSWORD_QUEUE_DEPTH = int(os.environ.get("LAGSENSE_PASSWORD_QUEUE_DEPTH", str(PASSWORD_WORKERS * 4)))
+PASSWORD_TIMEOUT = 30
+
+class PasswordPoolBusy(Exception):
+    """Raised when the password pool's queue is full (map to 429)"""
+
+_pool = None
+_pool_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(PASSWORD_WORKERS + PASSWORD_QUEUE_DEPTH)
+
+def _lower_priority():
+    """Pool initializer: let request threads win the CPU when cores are scarce"""
+    if hasattr(os, "nice"):
+        os.nice(10)
+
+def _mp_context():
+    """Start method for the pool: never a plain fork of this process"""
+    # The pool starts lazily, after the ingest writers and the reaper are
+    # running; a fork would copy whatever locks those threads hold
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=PASSWORD_WORKERS, mp_context=_mp_context(),
+                                        initializer=_lower_priority)
+        return _pool
+
+def shutdown_password_pool():
+    """Stop the worker processes (call on app shutdown)"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True, cancel_futures=True)
+            _pool = None
+
+def _run_in_pool(fn, *args):
+    """Run fn in the password pool and wait for it; raises PasswordPoolBusy when saturated"""
+    if not _slots.acquire(blocking=False):
+        raise PasswordPoolBusy("Too many password operations in progress, retry shortly")
+    try:
+        future = _get_pool().submit(fn, *args)
+    except Exception:
+        _slots.release()
+        raise
+    future.add_done_callback(lambda _: _slots.release())
+    return future.result(timeout=PASSWORD_TIMEOUT)
+
+def _hash(password: str) -> str:
     if len(password) > 1000:
         password = password[:1000]  # Safety limit
     return pwd_context.hash(password)
 
-def verify_password(password: str, hashed_password: str) -> bool:
-    """Verify password against hash"""
+def _verify(password: str, hashed_password: str) -> bool:
     if len(password) > 1000:
         password = password[:1000]
     return pwd_context.verify(password, hashed_password)
 
+def hash_password(password: str) -> str:
+    """Hash password using argon2 (no 72-byte limit like bcrypt)"""
+    return _run_in_pool(_hash, password)
+
+def verify_password(password: str, hashed_password: str) -> bool:
+    """Verify password against hash"""
+    return _run_in_pool(_verify, password, hashed_password)
+
 def register_user(db: Session, email: str, password: str):
     """Register a new user"""
     existing = db.query(User).filter(User.email == email).first()
@@ -39,4 +105,4 @@ def login_user(db: Session, email: str, password: str):
         return None
     if not verify_password(password, user.password):
         return None
-    return user
\ No newline at end of file
+    return user
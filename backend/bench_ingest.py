@@ -0,0 +1,68 @@
+"""Ingest throughput benchmark for the group-commit writer.
+
+Pushes samples from several producer threads into an IngestQueue backed
+by a throwaway SQLite file and reports committed samples per second.
+
+    python bench_ingest.py [samples] [producers]
+
+Set LAGSENSE_DURABILITY=full|normal|fast to compare durability modes.
+"""
+import os
+import sys
+import time
+import tempfile
+import threading
+from datetime import datetime
+
+from sqlalchemy.orm import sessionmaker
+
+from database import create_db_engine, init_db, DURABILITY
+from ingest import IngestQueue, QueueFull
+
+
+def producer(ingest, user_id, count):
+    now = datetime.utcnow()
+    sent = 0
+    while sent < count:
+        row = {"ping": 30.0 + sent % 7, "jitter": 2.0, "packet_loss": 0.0, "timestamp": now}
+        try:
+            ingest.submit(user_id, "valorant", [row])
+            sent += 1
+        except QueueFull:
+            time.sleep(0.001)
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    producers = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        init_db(engine)
+        ingest = IngestQueue(sessionmaker(bind=engine, autocommit=False, autoflush=False))
+        ingest.start()
+
+        per_producer = total // producers
+        threads = [
+            threading.Thread(target=producer, args=(ingest, user_id, per_producer))
+            for user_id in range(1, producers + 1)
+        ]
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        ingest.flush(timeout=120)
+        elapsed = time.perf_counter() - started
+        ingest.stop()
+        engine.dispose()
+
+    committed = ingest.committed_rows
+    print(f"durability:  {DURABILITY}")
+    print(f"samples:     {committed} from {producers} producers")
+    print(f"batches:     {ingest.committed_batches} (avg {committed / max(1, ingest.committed_batches):.0f} rows)")
+    print(f"throughput:  {committed / elapsed:,.0f} samples/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""/stat latency during a login storm.
+
+Starts the API on a throwaway database, sends a steady stream of /stat
+samples and reports their latency before and during a burst of
+concurrent /login calls.
+
+    python bench_login_storm.py [storm_clients] [seconds] [--inline]
+
+--inline hashes on the request threads (the old behaviour) for comparison.
+"""
+import os
+import sys
+import json
+import time
+import tempfile
+import threading
+import http.client
+from collections import Counter
+from datetime import datetime
+
+TMP = tempfile.mkdtemp()
+os.environ["LAGSENSE_DATABASE_URL"] = f"sqlite:///{os.path.join(TMP, 'bench.db')}"
+
+import uvicorn
+
+import auth
+import main as api
+
+PORT = 8765
+STAT_RATE = 100  # /stat requests per second
+
+
+def call(conn, method, path, body):
+    conn.request(method, path, body=json.dumps(body), headers={"Content-Type": "application/json"})
+    response = conn.getresponse()
+    response.read()
+    return response.status, response.getheader("Retry-After")
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] if values else 0.0
+
+
+def stat_sender(stop, latencies):
+    conn = http.client.HTTPConnection("127.0.0.1", PORT)
+    interval = 1 / STAT_RATE
+    next_send = time.perf_counter()
+    while not stop.is_set():
+        body = {"user_id": 1, "game": "valorant", "ping": 30.0, "jitter": 2.0, "loss": 0.0,
+                "timestamp": datetime.utcnow().isoformat()}
+        started = time.perf_counter()
+        call(conn, "POST", "/stat", body)
+        latencies.append((time.perf_counter() - started) * 1000)
+        next_send += interval
+        time.sleep(max(0.0, next_send - time.perf_counter()))
+
+
+def login_storm(stop, statuses):
+    conn = http.client.HTTPConnection("127.0.0.1", PORT)
+    while not stop.is_set():
+        status, retry_after = call(conn, "POST", "/login", {"email": "storm@lagsense.dev", "password": "correct horse"})
+        statuses.append(status)
+        if retry_after:
+            # Well-behaved clients back off when told to
+            stop.wait(float(retry_after))
+
+
+def measure(seconds, storm_clients):
+    stop = threading.Event()
+    latencies, statuses = [], []
+    threads = [threading.Thread(target=stat_sender, args=(stop, latencies))]
+    threads += [threading.Thread(target=login_storm, args=(stop, statuses)) for _ in range(storm_clients)]
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    return latencies, statuses
+
+
+def report(label, latencies, statuses=None):
+    line = (f"{label:<14} /stat n={len(latencies):<5} p50 {percentile(latencies, 0.50):6.1f}ms  "
+            f"p99 {percentile(latencies, 0.99):6.1f}ms")
+    if statuses:
+        line += "  /login " + ", ".join(f"{code}: {n}" for code, n in sorted(Counter(statuses).items()))
+    print(line)
+
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    storm_clients = int(args[0]) if args else 32
+    seconds = float(args[1]) if len(args) > 1 else 5
+
+    if "--inline" in sys.argv:
+        auth._run_in_pool = lambda fn, *a: fn(*a)
+
+    server = uvicorn.Server(uvicorn.Config(api.app, port=PORT, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+
+    conn = http.client.HTTPConnection("127.0.0.1", PORT)
+    call(conn, "POST", "/register", {"email": "storm@lagsense.dev", "password": "correct horse"})
+
+    mode = "inline" if "--inline" in sys.argv else f"pool of {auth.PASSWORD_WORKERS} (+{auth.PASSWORD_QUEUE_DEPTH} queued)"
+    print(f"argon2: {mode}, storm: {storm_clients} clients, {seconds:.0f}s per phase")
+    report("baseline", *measure(seconds, 0)[:1])
+    report("login storm", *measure(seconds, storm_clients))
+
+    server.should_exit = True
+    thread.join()
+
+
+if __name__ == "__main__":
+    main()
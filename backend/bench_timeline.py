@@ -0,0 +1,101 @@
+"""Timeline serialization micro-benchmark.
+
+Builds one session with N samples in a throwaway database and compares
+the old path (ORM rows, .isoformat() per point, stdlib JSONResponse)
+with the current /session handler and FastJSONResponse.
+
+    python bench_timeline.py [samples] [repeats]
+"""
+import os
+import sys
+import gzip
+import time
+import tempfile
+from datetime import datetime, timedelta
+
+TMP = tempfile.mkdtemp()
+os.environ["LAGSENSE_DATABASE_URL"] = f"sqlite:///{os.path.join(TMP, 'bench.db')}"
+
+from fastapi.responses import JSONResponse
+from sqlalchemy import insert
+
+import responses
+import main as api
+from database import SessionLocal, User, Session as DBSession, NetworkStat
+
+
+def best_of(repeats, fn):
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return min(timings), result
+
+
+def seed(samples):
+    db = SessionLocal()
+    user = User(email="bench@lagsense.dev", password="x")
+    db.add(user)
+    db.flush()
+    session = DBSession(user_id=user.id, game="valorant", start_time=datetime.utcnow())
+    db.add(session)
+    db.flush()
+    start = datetime.utcnow()
+    db.execute(insert(NetworkStat), [
+        {"session_id": session.id, "user_id": user.id, "ping": 30.0 + i % 17, "jitter": 2.5,
+         "packet_loss": 0.0, "timestamp": start + timedelta(milliseconds=250 * i)}
+        for i in range(samples)
+    ])
+    db.commit()
+    ids = user.id, session.id
+    db.close()
+    return ids
+
+
+def old_timeline(session_id):
+    db = SessionLocal()
+    try:
+        stats = db.query(NetworkStat).filter(NetworkStat.session_id == session_id).all()
+        return JSONResponse(content={"timeline": [
+            {"time": s.timestamp.isoformat(), "ping": s.ping, "jitter": s.jitter, "loss": s.packet_loss}
+            for s in stats
+        ]}).body
+    finally:
+        db.close()
+
+
+def new_handler(user_id, session_id):
+    db = SessionLocal()
+    try:
+        return api.analyze_session_by_id(user_id, session_id, db).body
+    finally:
+        db.close()
+
+
+def main():
+    samples = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    user_id, session_id = seed(samples)
+
+    serializer = "orjson" if responses.orjson is not None else "stdlib fallback"
+    print(f"timeline of {samples} points, best of {repeats}, serializer: {serializer}")
+
+    old_ms, old_body = best_of(repeats, lambda: old_timeline(session_id))
+    new_ms, new_body = best_of(repeats, lambda: new_handler(user_id, session_id))
+    print(f"old (ORM + isoformat + stdlib):  {old_ms:7.1f} ms  {len(old_body):>9,} B")
+    print(f"new /session handler:            {new_ms:7.1f} ms  {len(new_body):>9,} B "
+          f"({len(gzip.compress(new_body, 6)):,} B gzipped)")
+
+    content = {"timeline": [
+        {"time": datetime(2026, 1, 1) + timedelta(milliseconds=250 * i), "ping": 30.0, "jitter": 2.5, "loss": 0.0}
+        for i in range(samples)
+    ]}
+    iso_content = {"timeline": [dict(p, time=p["time"].isoformat()) for p in content["timeline"]]}
+    stdlib_ms, _ = best_of(repeats, lambda: JSONResponse(content=iso_content).body)
+    fast_ms, _ = best_of(repeats, lambda: responses.FastJSONResponse(content=content).body)
+    print(f"render only: stdlib {stdlib_ms:.1f} ms (isoformat excluded), FastJSONResponse {fast_ms:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
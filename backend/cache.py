@@ -0,0 +1,68 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+# Users whose results are kept in memory
+MAX_CACHED_USERS = 1000
+
+
+class ReadCache:
+    """Per-user memo of dashboard read results, dropped whenever the user's data changes.
+
+    Results are computed on first read and kept until ``invalidate`` is
+    called for that user: by the ingest writer after each commit, and by
+    end-session, settings updates, re-score jobs and the reaper. A result
+    computed while a write was landing is not stored, because the user's
+    version moved in between. The least recently read users are evicted
+    past ``max_users``.
+    """
+
+    def __init__(self, max_users=MAX_CACHED_USERS):
+        self.max_users = max_users
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id, key, compute):
+        """Cached value of ``key`` for the user, computing it with ``compute()`` on a miss"""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and key in entry:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[key]
+            version = self._versions.get(user_id, 0)
+            self.misses += 1
+
+        value = compute()
+
+        with self._lock:
+            if self._versions.get(user_id, 0) == version:
+                self._entries.setdefault(user_id, {})[key] = value
+                self._entries.move_to_end(user_id)
+                while len(self._entries) > self.max_users:
+                    self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self, *user_ids):
+        with self._lock:
+            for user_id in user_ids:
+                self._versions[user_id] = self._versions.get(user_id, 0) + 1
+                self._entries.pop(user_id, None)
+
+
+def etag_for(body: bytes) -> str:
+    """Weak validator for a response body (weak: compression may re-encode it)"""
+    return f'W/"{hashlib.blake2b(body, digest_size=12).hexdigest()}"'
+
+
+def etag_matches(if_none_match, etag: str) -> bool:
+    """Whether an If-None-Match header covers ``etag`` (weak comparison, RFC 9110 13.1.2)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
@@ -1,16 +1,90 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, Boolean, ForeignKey
+from sqlalchemy import create_engine, event, inspect, text, Index, Column, Integer, String, Text, Float, DateTime, Boolean, ForeignKey
 from sqlalchemy.orm import declarative_base, sessionmaker, relationship
-from datetime import datetime
+from datetime import datetime, timezone
+import hashlib
+import tempfile
+import os
 
-DATABASE_URL = "sqlite:///./lagsense.db"
+DATABASE_URL = os.environ.get("LAGSENSE_DATABASE_URL", "sqlite:///./lagsense.db")
 
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False}
-)
+# Ingest durability:
+#   full   - fsync every commit; /stat answers only after its sample is committed
+#   normal - WAL with synchronous=NORMAL; /stat answers once the sample is queued
+#   fast   - synchronous=OFF; a crash may lose the last few batches
+DURABILITY = os.environ.get("LAGSENSE_DURABILITY", "normal")
+SQLITE_SYNCHRONOUS = {"full": "FULL", "normal": "NORMAL", "fast": "OFF"}
+
+def create_db_engine(url):
+    engine = create_engine(
+        url,
+        connect_args={"check_same_thread": False}
+    )
+
+    if url.startswith("sqlite"):
+        @event.listens_for(engine, "connect")
+        def set_sqlite_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            # WAL lets readers run while the ingest writer commits
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS.get(DURABILITY, 'NORMAL')}")
+            cursor.close()
+
+    return engine
+
+engine = create_db_engine(DATABASE_URL)
 
 SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
 
+# ================= SINGLE WRITER =================
+# The database is written by exactly one group-commit ingest thread, and
+# that thread, the reaper and the read cache keep in-memory state (open
+# sessions, last-seen times, cached reads) about it. So the API runs as ONE
+# process (uvicorn --workers 1), and ingest is bounded by that one writer:
+# about 1.7-2k samples/s on one core (bench_ingest.py). The lock below
+# makes a second process fail at startup instead of silently racing the
+# first on the same file.
+
+class WriterLockHeld(RuntimeError):
+    """Another process already owns a database's writer"""
+
+def writer_lock_path(engine):
+    """Lock file guarding an engine's database, or None for in-memory SQLite"""
+    url = engine.url
+    if url.get_backend_name() == "sqlite":
+        if not url.database or url.database == ":memory:":
+            return None
+        return os.path.abspath(url.database) + ".writer.lock"
+    digest = hashlib.md5(url.render_as_string(hide_password=True).encode()).hexdigest()[:16]
+    return os.path.join(tempfile.gettempdir(), f"lagsense-writer-{digest}.lock")
+
+def acquire_writer_lock(engine):
+    """Take the process-wide writer lock for an engine; returns the open lock file (keep it open)"""
+    path = writer_lock_path(engine)
+    if path is None:
+        return None
+    lock_file = open(path, "a+")
+    try:
+        if os.name == "nt":
+            import msvcrt
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        raise WriterLockHeld(
+            f"{engine.url.render_as_string(hide_password=True)} is already being written by another process; "
+            "run the API as a single process (uvicorn --workers 1)"
+        )
+    return lock_file
+
+def utc_naive(value):
+    """Timestamps are stored as naive UTC; convert aware datetimes to match"""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
 Base = declarative_base()
 
 class User(Base):
@@ -28,6 +102,10 @@ class User(Base):
 
 class Session(Base):
     __tablename__ = "sessions"
+    __table_args__ = (
+        # Cursor-paginated session lists per user and game
+        Index("ix_sessions_user_game_id", "user_id", "game", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -38,6 +116,10 @@ class Session(Base):
     avg_ping = Column(Float, default=0)
     avg_jitter = Column(Float, default=0)
     avg_loss = Column(Float, default=0)
+    # Samples folded into the averages so far (lets ingest update them incrementally)
+    sample_count = Column(Integer, nullable=True)
+    # Game server played on ("host:port" discovered by the agent; NULL if unknown)
+    server = Column(String, nullable=True)
     
     # Relationships
     user = relationship("User", back_populates="sessions")
@@ -45,18 +127,71 @@ class Session(Base):
 
 class NetworkStat(Base):
     __tablename__ = "network_stats"
+    __table_args__ = (
+        # Time-range exports of a user's samples
+        Index("ix_network_stats_user_time", "user_id", "timestamp"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    session_id = Column(Integer, ForeignKey("sessions.id"), nullable=False)
+    session_id = Column(Integer, ForeignKey("sessions.id"), nullable=False, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     ping = Column(Float, default=0)
     jitter = Column(Float, default=0)
     packet_loss = Column(Float, default=0)
     timestamp = Column(DateTime, default=datetime.utcnow)
+
+    # Agent-side streaming statistics (NULL for older agents)
+    ping_ewma = Column(Float, nullable=True)
+    ping_mean = Column(Float, nullable=True)
+    ping_p50 = Column(Float, nullable=True)
+    ping_p95 = Column(Float, nullable=True)
+    loss_window = Column(Float, nullable=True)
+    # RTT / loss to the game server itself (NULL for older agents)
+    server_rtt = Column(Float, nullable=True)
+    server_loss = Column(Float, nullable=True)
+    # Per path segment RTT / jitter / loss measured at the same instant:
+    # lan = default gateway, isp = first ISP hop, remote = probe target
+    # (NULL for older agents or segments the agent couldn't find)
+    lan_rtt = Column(Float, nullable=True)
+    lan_jitter = Column(Float, nullable=True)
+    lan_loss = Column(Float, nullable=True)
+    isp_rtt = Column(Float, nullable=True)
+    isp_jitter = Column(Float, nullable=True)
+    isp_loss = Column(Float, nullable=True)
+    remote_rtt = Column(Float, nullable=True)
+    remote_jitter = Column(Float, nullable=True)
+    remote_loss = Column(Float, nullable=True)
+    # Busiest processes when the agent saw an RTT spike, as JSON
+    # {"down_kbps", "up_kbps", "source", "top": [{"name", "pid", "kbps"}]}; NULL otherwise
+    top_talkers = Column(Text, nullable=True)
     
     # Relationships
     session = relationship("Session", back_populates="stats")
 
+class AnomalyEvent(Base):
+    __tablename__ = "anomaly_events"
+    __table_args__ = (
+        Index("ix_anomaly_events_user_id", "user_id", "id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    session_id = Column(Integer, ForeignKey("sessions.id"), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    game = Column(String, nullable=False)
+    metric = Column(String, nullable=False)
+    value = Column(Float)
+    baseline = Column(Float)
+    zscore = Column(Float)
+    timestamp = Column(DateTime, default=datetime.utcnow)
+
+class AnomalyState(Base):
+    """Snapshot of a session's streaming anomaly detector (see anomaly.py)"""
+    __tablename__ = "anomaly_state"
+
+    session_id = Column(Integer, ForeignKey("sessions.id"), primary_key=True)
+    state = Column(Text, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
 class UserSettings(Base):
     __tablename__ = "user_settings"
 
@@ -93,5 +228,21 @@ class UserSettings(Base):
     # Relationships
     user = relationship("User", back_populates="settings")
 
-def init_db():
-    Base.metadata.create_all(bind=engine)
\ No newline at end of file
+def migrate_db(bind=engine):
+    """Add columns and indexes introduced after a table was created (create_all skips existing tables)"""
+    inspector = inspect(bind)
+    with bind.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    col_type = column.type.compile(bind.dialect)
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {col_type}"))
+            for index in table.indexes:
+                index.create(bind=conn, checkfirst=True)
+
+def init_db(bind=engine):
+    Base.metadata.create_all(bind=bind)
+    migrate_db(bind)
\ No newline at end of file
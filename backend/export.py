@@ -0,0 +1,193 @@
+import io
+import csv
+from datetime import datetime
+
+from sqlalchemy import select
+
+from responses import dumps
+from database import SessionLocal, utc_naive, Session as DBSession, NetworkStat
+
+# Rows fetched per round trip, and rows per Parquet row group
+EXPORT_CHUNK_ROWS = 5000
+
+EXPORT_COLUMNS = [
+    "timestamp", "session_id", "game", "server", "ping", "jitter", "packet_loss",
+    "ping_ewma", "ping_mean", "ping_p50", "ping_p95", "loss_window", "server_rtt", "server_loss",
+    "lan_rtt", "lan_jitter", "lan_loss", "isp_rtt", "isp_jitter", "isp_loss",
+    "remote_rtt", "remote_jitter", "remote_loss", "top_talkers"
+]
+
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+class ExportFormatError(Exception):
+    """Raised for an unknown export format or one whose library isn't installed"""
+
+
+def check_format(fmt):
+    """Fail before streaming starts if ``fmt`` can't be produced"""
+    if fmt not in MEDIA_TYPES:
+        raise ExportFormatError(f"Unknown export format '{fmt}' (use {', '.join(MEDIA_TYPES)})")
+    if fmt == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ExportFormatError("Parquet export needs pyarrow installed on the server")
+
+
+def iter_chunks(user_id, start=None, end=None, game=None, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Yield lists of stat rows (tuples in EXPORT_COLUMNS order) oldest first.
+
+    Opens its own DB session: the generator runs while the response is
+    streamed, after the request's dependencies have been torn down. Rows
+    come through a server-side cursor ``chunk_rows`` at a time, so memory
+    doesn't grow with the size of the export.
+    """
+    query = select(
+        NetworkStat.timestamp, NetworkStat.session_id, DBSession.game, DBSession.server,
+        NetworkStat.ping, NetworkStat.jitter, NetworkStat.packet_loss,
+        NetworkStat.ping_ewma, NetworkStat.ping_mean, NetworkStat.ping_p50, NetworkStat.ping_p95,
+        NetworkStat.loss_window,
+        NetworkStat.server_rtt, NetworkStat.server_loss,
+        NetworkStat.lan_rtt, NetworkStat.lan_jitter, NetworkStat.lan_loss,
+        NetworkStat.isp_rtt, NetworkStat.isp_jitter, NetworkStat.isp_loss,
+        NetworkStat.remote_rtt, NetworkStat.remote_jitter, NetworkStat.remote_loss,
+        NetworkStat.top_talkers
+    ).join(DBSession, NetworkStat.session_id == DBSession.id).where(NetworkStat.user_id == user_id)
+
+    start, end = utc_naive(start), utc_naive(end)
+    if start is not None:
+        query = query.where(NetworkStat.timestamp >= start)
+    if end is not None:
+        query = query.where(NetworkStat.timestamp < end)
+    if game is not None:
+        query = query.where(DBSession.game == game)
+
+    query = query.order_by(NetworkStat.timestamp, NetworkStat.id).execution_options(
+        stream_results=True, yield_per=chunk_rows
+    )
+
+    db = SessionLocal()
+    try:
+        result = db.execute(query)
+        for partition in result.partitions():
+            yield partition
+    finally:
+        db.close()
+
+
+def _iso(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+# ---------- CSV / NDJSON ----------
+def stream_csv(chunks):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for chunk in chunks:
+        writer.writerows((_iso(row[0]),) + tuple(row[1:]) for row in chunk)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    # Header only when there's nothing to export
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def stream_ndjson(chunks):
+    for chunk in chunks:
+        yield b"".join(dumps(dict(zip(EXPORT_COLUMNS, row))) + b"\n" for row in chunk)
+
+
+# ---------- PARQUET ----------
+class _DrainSink:
+    """Write-only file object that hands back what was written since the last drain"""
+
+    def __init__(self):
+        self.closed = False
+        self._parts = []
+        self._position = 0
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+
+def stream_parquet(chunks):
+    """One Parquet row group per chunk; each group is yielded as soon as it is written"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ("timestamp", pa.timestamp("us")),
+        ("session_id", pa.int64()),
+        ("game", pa.string()),
+        ("server", pa.string()),
+        ("ping", pa.float64()),
+        ("jitter", pa.float64()),
+        ("packet_loss", pa.float64()),
+        ("ping_ewma", pa.float64()),
+        ("ping_mean", pa.float64()),
+        ("ping_p50", pa.float64()),
+        ("ping_p95", pa.float64()),
+        ("loss_window", pa.float64()),
+        ("server_rtt", pa.float64()),
+        ("server_loss", pa.float64()),
+        ("lan_rtt", pa.float64()),
+        ("lan_jitter", pa.float64()),
+        ("lan_loss", pa.float64()),
+        ("isp_rtt", pa.float64()),
+        ("isp_jitter", pa.float64()),
+        ("isp_loss", pa.float64()),
+        ("remote_rtt", pa.float64()),
+        ("remote_jitter", pa.float64()),
+        ("remote_loss", pa.float64()),
+        ("top_talkers", pa.string()),
+    ])
+
+    sink = _DrainSink()
+    writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    try:
+        for chunk in chunks:
+            columns = list(zip(*chunk))
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+                schema=schema
+            ))
+            yield sink.drain()
+    finally:
+        writer.close()
+    # Footer
+    yield sink.drain()
+
+
+STREAMERS = {
+    "csv": stream_csv,
+    "ndjson": stream_ndjson,
+    "parquet": stream_parquet,
+}
+
+
+def export_stream(user_id, fmt, start=None, end=None, game=None):
+    """Byte chunks of the user's stats in the requested format"""
+    return STREAMERS[fmt](iter_chunks(user_id, start, end, game))
@@ -0,0 +1,376 @@
+import os
+import time
+import queue
+import threading
+from datetime import datetime
+
+from sqlalchemy import insert, update, func
+
+from database import Session as DBSession, NetworkStat, utc_naive
+from anomaly import AnomalyDetector
+from analysis import finalize_session
+
+# How long samples must keep naming another game server before the open
+# session is closed and a new one started; shorter flips (the ranking
+# trading places between two endpoints) stay in the session
+SERVER_SWITCH_SECONDS = int(os.environ.get("LAGSENSE_SERVER_SWITCH_SECONDS", "60"))
+
+
+class QueueFull(Exception):
+    """Raised when the ingest queue can't take more samples (backpressure)"""
+
+
+class IngestItem:
+    """Samples for one (user, game) waiting to be written"""
+
+    __slots__ = ("user_id", "game", "rows", "server", "done", "session_id", "error")
+
+    def __init__(self, user_id, game, rows, wait=False, server=None):
+        self.user_id = user_id
+        self.game = game
+        self.rows = rows
+        self.server = server
+        self.done = threading.Event() if wait else None
+        self.session_id = None
+        self.error = None
+
+
+class OpenSession:
+    """Last-seen entry for an open session, kept current by the ingest writer"""
+
+    __slots__ = ("user_id", "game", "last_sample", "last_seen")
+
+    def __init__(self, user_id, game, last_sample, last_seen):
+        self.user_id = user_id
+        self.game = game
+        self.last_sample = last_sample
+        self.last_seen = last_seen
+
+
+class IngestQueue:
+    """Group-commit writer for network samples.
+
+    Request handlers only validate and enqueue. A single writer thread
+    drains the queue every ``max_delay`` seconds or ``max_rows`` rows,
+    whichever comes first, and writes everything it drained in ONE
+    transaction: open-session lookup/creation, a bulk INSERT of the
+    samples and an incremental update of the session averages. On SQLite
+    that turns one fsync per sample into one fsync per batch.
+
+    ``open_index`` maps each open session id to an OpenSession so the
+    stale-session reaper never has to scan the database. Anything that
+    closes sessions holds ``write_lock`` so it can't interleave with a
+    batch being written.
+
+    Every batch also runs through ``detector`` (see anomaly.py); its
+    events are committed with the samples.
+
+    A session keeps the first game server its samples name. Only when
+    every sample for ``SERVER_SWITCH_SECONDS`` names the same other
+    server is the session closed and a new one started for it (a new
+    match); until then those samples stay in the open session.
+
+    ``on_change`` is called with the ids of the users whose data a
+    commit changed (cache invalidation).
+    """
+
+    def __init__(self, session_factory, max_rows=1000, max_delay=0.005, maxsize=20000, detector=None,
+                 on_change=None):
+        self.session_factory = session_factory
+        self.detector = detector if detector is not None else AnomalyDetector()
+        self.on_change = on_change
+        self.max_rows = max_rows
+        self.max_delay = max_delay
+        self.committed_rows = 0
+        self.committed_batches = 0
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._open_sessions = {}
+        self._session_servers = {}
+        self._server_switches = {}
+        self.open_index = {}
+        self.write_lock = threading.Lock()
+        self._thread = None
+        self._stopping = False
+
+    # ---------- PRODUCER SIDE ----------
+    def submit(self, user_id, game, rows, wait=False, timeout=10, block=False, server=None):
+        """Queue rows for a user's open session; with wait=True block until committed.
+
+        Raises QueueFull straight away when the queue is full, unless
+        ``block`` is set, in which case it waits up to ``timeout`` for room.
+        """
+        item = IngestItem(user_id, game, rows, wait=wait, server=server)
+        try:
+            self._queue.put(item, block=block, timeout=timeout if block else None)
+        except queue.Full:
+            raise QueueFull("Ingest queue is full")
+
+        if wait:
+            if not item.done.wait(timeout):
+                raise TimeoutError("Timed out waiting for ingest commit")
+            if item.error:
+                raise item.error
+        return item
+
+    def forget_session(self, user_id, game, session_id=None):
+        """Drop the cached open session (call when a session is ended)
+
+        With ``session_id`` only that session is dropped, never a newer one
+        opened for the same (user, game).
+        """
+        key = (user_id, game)
+        if session_id is None or self._open_sessions.get(key) == session_id:
+            session_id = self._open_sessions.pop(key, session_id)
+        if session_id is not None:
+            self.open_index.pop(session_id, None)
+            self._session_servers.pop(session_id, None)
+            self._server_switches.pop(session_id, None)
+            self.detector.forget(session_id)
+
+    def seed_open_index(self):
+        """Load open sessions and their last sample time from the database (call before start)"""
+        db = self.session_factory()
+        try:
+            rows = db.query(
+                DBSession.id, DBSession.user_id, DBSession.game, DBSession.start_time,
+                func.max(NetworkStat.timestamp)
+            ).outerjoin(NetworkStat, NetworkStat.session_id == DBSession.id).filter(
+                DBSession.end_time == None
+            ).group_by(DBSession.id).all()
+        finally:
+            db.close()
+
+        for session_id, user_id, game, start_time, last_sample in rows:
+            seen = last_sample or start_time
+            self.open_index[session_id] = OpenSession(user_id, game, seen, seen)
+        return len(rows)
+
+    def changed(self, user_ids):
+        """Report users whose data was just committed"""
+        if self.on_change is not None and user_ids:
+            self.on_change(*user_ids)
+
+    @property
+    def depth(self):
+        return self._queue.qsize()
+
+    # ---------- WRITER SIDE ----------
+    def start(self):
+        if self._thread is None:
+            db = self.session_factory()
+            try:
+                self.detector.restore(db)
+            finally:
+                db.close()
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="ingest-writer", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=10):
+        """Flush everything queued so far and stop the writer"""
+        if self._thread is not None:
+            self._stopping = True
+            self._thread.join(timeout)
+            self._thread = None
+
+    def flush(self, timeout=10):
+        """Block until everything queued before this call is committed"""
+        self.submit(None, None, [], wait=True, timeout=timeout, block=True)
+
+    def _drain(self):
+        """Collect one batch: block for the first item, then up to max_delay / max_rows"""
+        try:
+            first = self._queue.get(timeout=0.1)
+        except queue.Empty:
+            return []
+
+        batch = [first]
+        rows = len(first.rows)
+        deadline = time.monotonic() + self.max_delay
+        while rows < self.max_rows:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(item)
+            rows += len(item.rows)
+        return batch
+
+    def _run(self):
+        while not (self._stopping and self._queue.empty()):
+            if self.detector.snapshot_due(datetime.utcnow()):
+                self._snapshot()
+            batch = self._drain()
+            if not batch:
+                continue
+            try:
+                with self.write_lock:
+                    self._write(batch)
+            except Exception as e:
+                # The cached session ids may be stale after a failed transaction
+                self._open_sessions.clear()
+                self._session_servers.clear()
+                self._server_switches.clear()
+                print(f"✗ Ingest batch of {len(batch)} failed: {e}")
+                for item in batch:
+                    item.error = e
+            finally:
+                for item in batch:
+                    if item.done is not None:
+                        item.done.set()
+        self._snapshot()
+
+    def _snapshot(self):
+        """Persist the anomaly detector state"""
+        with self.write_lock:
+            db = self.session_factory()
+            try:
+                self.detector.snapshot(db)
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                print(f"✗ Anomaly state snapshot failed: {e}")
+            finally:
+                db.close()
+
+    def _session_for(self, db, user_id, game, server=None):
+        """Open session id for (user, game) on ``server``, creating the session if needed"""
+        key = (user_id, game)
+        session_id = self._open_sessions.get(key)
+        if session_id is not None and not self._claim(db, session_id):
+            # Closed behind the cache's back (end-session, the reaper or
+            # another process): never write into an ended session
+            self.forget_session(user_id, game, session_id)
+            session_id = None
+        if session_id is None:
+            db_session = db.query(DBSession).filter(
+                DBSession.user_id == user_id,
+                DBSession.game == game,
+                DBSession.end_time == None
+            ).first()
+            if db_session:
+                session_id = self._remember(key, db_session)
+
+        if session_id is not None:
+            known = self._session_servers.get(session_id)
+            if not server:
+                return session_id
+            if known == server:
+                # Back on the session's server: any pending switch was a flip
+                self._server_switches.pop(session_id, None)
+                return session_id
+            if known is None:
+                # First sample that knows the server
+                db.get(DBSession, session_id).server = server
+                self._session_servers[session_id] = server
+                return session_id
+            now = datetime.utcnow()
+            candidate, since = self._server_switches.get(session_id, (None, None))
+            if candidate != server:
+                self._server_switches[session_id] = (server, now)
+                return session_id
+            if (now - since).total_seconds() < SERVER_SWITCH_SECONDS:
+                return session_id
+            # Same game, another server for long enough: the player is in a new match
+            finalize_session(db, db.get(DBSession, session_id), end_time=now)
+            self.forget_session(user_id, game, session_id)
+
+        db_session = DBSession(user_id=user_id, game=game, start_time=datetime.utcnow(),
+                               sample_count=0, server=server)
+        db.add(db_session)
+        db.flush()
+        return self._remember(key, db_session)
+
+    def _claim(self, db, session_id):
+        """Whether the session is still open, taking the write lock on its row
+
+        A no-op UPDATE guarded by ``end_time IS NULL``: its row count says
+        if the session is open, and from here to the commit nobody else
+        can close it.
+        """
+        result = db.execute(
+            update(DBSession).where(DBSession.id == session_id, DBSession.end_time == None).values(end_time=None)
+        )
+        return result.rowcount == 1
+
+    def _remember(self, key, db_session):
+        self._open_sessions[key] = db_session.id
+        self._session_servers[db_session.id] = db_session.server
+        return db_session.id
+
+    def _write(self, batch):
+        db = self.session_factory()
+        try:
+            # Per-session sums for the incremental average update
+            totals = {}
+            latest = {}
+            events = []
+            all_rows = []
+            for item in batch:
+                if not item.rows:
+                    continue
+                session_id = self._session_for(db, item.user_id, item.game, item.server)
+                item.session_id = session_id
+                count, ping, jitter, loss = totals.get(session_id, (0, 0.0, 0.0, 0.0))
+                for row in item.rows:
+                    row["session_id"] = session_id
+                    row["user_id"] = item.user_id
+                    count += 1
+                    ping += row["ping"]
+                    jitter += row["jitter"]
+                    loss += row["packet_loss"]
+                totals[session_id] = (count, ping, jitter, loss)
+                newest = max(utc_naive(row["timestamp"]) for row in item.rows)
+                if session_id not in latest or newest > latest[session_id][2]:
+                    latest[session_id] = (item.user_id, item.game, newest)
+                events.extend(self.detector.process(session_id, item.user_id, item.game, item.rows))
+                all_rows.extend(item.rows)
+
+            # An executemany takes its column list from the first row, so
+            # rows carrying different optional columns (agent versions,
+            # server / segment fields) are inserted in separate groups
+            groups = {}
+            for row in all_rows:
+                groups.setdefault(tuple(row), []).append(row)
+            for rows in groups.values():
+                db.execute(insert(NetworkStat), rows)
+            self.detector.record(db, events)
+
+            for session_id, (count, ping, jitter, loss) in totals.items():
+                self._fold_averages(db, session_id, count, ping, jitter, loss)
+
+            db.commit()
+            self.committed_rows += len(all_rows)
+            self.committed_batches += 1
+            self.changed({item.user_id for item in batch if item.rows})
+            if events:
+                self.detector.publish(events)
+
+            now = datetime.utcnow()
+            for session_id, (user_id, game, newest) in latest.items():
+                entry = self.open_index.get(session_id)
+                if entry is None:
+                    self.open_index[session_id] = OpenSession(user_id, game, newest, now)
+                else:
+                    entry.last_sample = max(entry.last_sample, newest)
+                    entry.last_seen = now
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _fold_averages(self, db, session_id, count, ping, jitter, loss):
+        """Fold a batch's sums into the session's running averages"""
+        db_session = db.get(DBSession, session_id)
+        n = db_session.sample_count
+        if n is None:
+            # Session predates sample_count: count what was stored before this batch
+            n = db.query(func.count(NetworkStat.id)).filter(NetworkStat.session_id == session_id).scalar() - count
+
+        total = n + count
+        db_session.avg_ping = ((db_session.avg_ping or 0) * n + ping) / total
+        db_session.avg_jitter = ((db_session.avg_jitter or 0) * n + jitter) / total
+        db_session.avg_loss = ((db_session.avg_loss or 0) * n + loss) / total
+        db_session.sample_count = total
@@ -1,22 +1,62 @@
-from fastapi import FastAPI, Depends, HTTPException
+from contextlib import asynccontextmanager
+import asyncio
+from fastapi import FastAPI, Depends, HTTPException, Body, Header, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import StreamingResponse, Response
 from sqlalchemy.orm import Session
+from sqlalchemy import func
 from datetime import datetime, timedelta
 import statistics
+import numpy as np
 import os
-from typing import List
+from typing import List, Optional
 
-from database import SessionLocal, init_db, User, Session as DBSession, NetworkStat, UserSettings
-from auth import register_user, login_user, hash_password
+from database import (
+    SessionLocal, engine, init_db,
+    acquire_writer_lock,
+    User, Session as DBSession, NetworkStat, UserSettings, AnomalyEvent, DURABILITY
+)
+from ingest import IngestQueue, QueueFull
+from reaper import SessionReaper
+from rescore import RescoreJobs
+from cache import ReadCache, etag_for, etag_matches
+from auth import register_user, login_user, hash_password, PasswordPoolBusy, shutdown_password_pool
 from models import (
     AuthRequest, UserUpdate, NetworkStatCreate, VerdictResponse,
     SessionResponse, UserSettingsResponse, UserSettingsUpdate,
     GameThresholds, StatisticsResponse
 )
 import settings
-
-app = FastAPI(title="LagSense API")
+import wire
+import export
+import analysis
+from responses import FastJSONResponse, add_compression, dumps
+
+# Dashboard read results per user, dropped by every write to that user's data
+read_cache = ReadCache()
+# The single group-commit writer. It lives in this process: run the API
+# with a single worker (the writer lock taken at startup refuses a second one)
+ingest = IngestQueue(SessionLocal, on_change=read_cache.invalidate)
+# Stale-session reaper, sharing the writer's open-session index
+reaper = SessionReaper(ingest)
+# Verdict re-scoring after threshold changes
+rescore_jobs = RescoreJobs(on_change=read_cache.invalidate)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    writer_lock = acquire_writer_lock(engine)
+    ingest.start()
+    reaper.start()
+    yield
+    # Flush queued samples before the process exits
+    reaper.stop()
+    ingest.stop()
+    rescore_jobs.shutdown()
+    shutdown_password_pool()
+    if writer_lock is not None:
+        writer_lock.close()
+
+app = FastAPI(title="LagSense API", lifespan=lifespan, default_response_class=FastJSONResponse)
 
 # ================= CORS MIDDLEWARE =================
 app.add_middleware(
@@ -27,6 +67,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# ================= COMPRESSION =================
+add_compression(app)
+
 init_db()
 
 # ================= DATABASE =================
@@ -38,21 +81,31 @@ def get_db():
         db.close()
 
 # ================= AUTHENTICATION =================
+def password_pool_busy(e: PasswordPoolBusy) -> FastJSONResponse:
+    """429 for when the argon2 pool is saturated"""
+    return FastJSONResponse(
+        status_code=429,
+        headers={"Retry-After": "1"},
+        content={"success": False, "message": str(e)}
+    )
+
 @app.post("/register")
 def register(data: AuthRequest, db: Session = Depends(get_db)):
     try:
         user = register_user(db, data.email, data.password)
         if not user:
-            return JSONResponse(
+            return FastJSONResponse(
                 status_code=400,
                 content={"success": False, "message": "User already exists"}
             )
-        return JSONResponse(
+        return FastJSONResponse(
             status_code=200,
             content={"success": True, "user_id": user.id}
         )
+    except PasswordPoolBusy as e:
+        return password_pool_busy(e)
     except Exception as e:
-        return JSONResponse(
+        return FastJSONResponse(
             status_code=500,
             content={"success": False, "message": f"Registration error: {str(e)}"}
         )
@@ -62,16 +115,18 @@ def login(data: AuthRequest, db: Session = Depends(get_db)):
     try:
         user = login_user(db, data.email, data.password)
         if not user:
-            return JSONResponse(
+            return FastJSONResponse(
                 status_code=401,
                 content={"success": False, "message": "Invalid credentials"}
             )
-        return JSONResponse(
+        return FastJSONResponse(
             status_code=200,
             content={"success": True, "user_id": user.id}
         )
+    except PasswordPoolBusy as e:
+        return password_pool_busy(e)
     except Exception as e:
-        return JSONResponse(
+        return FastJSONResponse(
             status_code=500,
             content={"success": False, "message": f"Login error: {str(e)}"}
         )
@@ -82,26 +137,26 @@ def get_user(user_id: int, db: Session = Depends(get_db)):
     try:
         user = db.query(User).filter(User.id == user_id).first()
         if not user:
-            return JSONResponse(status_code=404, content={"error": "User not found"})
+            return FastJSONResponse(status_code=404, content={"error": "User not found"})
         
-        return JSONResponse(
+        return FastJSONResponse(
             status_code=200,
             content={
                 "id": user.id,
                 "email": user.email,
                 "display_name": user.display_name,
-                "created_at": user.created_at.isoformat()
+                "created_at": user.created_at
             }
         )
     except Exception as e:
-        return JSONResponse(status_code=500, content={"error": str(e)})
+        return FastJSONResponse(status_code=500, content={"error": str(e)})
 
 @app.put("/profile/{user_id}")
 def update_profile(user_id: int, data: UserUpdate, db: Session = Depends(get_db)):
     try:
         user = db.query(User).filter(User.id == user_id).first()
         if not user:
-            return JSONResponse(status_code=404, content={"success": False, "message": "User not found"})
+            return FastJSONResponse(status_code=404, content={"success": False, "message": "User not found"})
         
         if data.display_name:
             user.display_name = data.display_name
@@ -109,88 +164,123 @@ def update_profile(user_id: int, data: UserUpdate, db: Session = Depends(get_db)
             user.password = hash_password(data.password)
         
         db.commit()
-        return JSONResponse(status_code=200, content={"success": True, "message": "Profile updated"})
+        return FastJSONResponse(status_code=200, content={"success": True, "message": "Profile updated"})
+    except PasswordPoolBusy as e:
+        return password_pool_busy(e)
     except Exception as e:
-        return JSONResponse(status_code=500, content={"success": False, "message": str(e)})
+        return FastJSONResponse(status_code=500, content={"success": False, "message": str(e)})
 
 @app.get("/stats/users")
 def total_users(db: Session = Depends(get_db)):
     try:
         count = db.query(User).count()
-        return JSONResponse(status_code=200, content={"users": count or 0})
+        # Users who have played at least once
+        active = db.query(DBSession.user_id).distinct().count()
+        return FastJSONResponse(status_code=200, content={"users": count or 0, "active_users": active})
     except Exception as e:
-        return JSONResponse(status_code=500, content={"users": 0, "error": str(e)})
+        return FastJSONResponse(status_code=500, content={"users": 0, "error": str(e)})
 
 # ================= NETWORK STATS - RECEIVE DATA =================
-@app.post("/stat")
-def receive_stat(stat: NetworkStatCreate, db: Session = Depends(get_db)):
-    try:
-        thresholds = settings.get_user_thresholds(db, stat.user_id)
-        
-        if stat.game not in thresholds:
-            return JSONResponse(status_code=200, content={"status": "ignored"})
+def enqueue_samples(user_id: int, game: str, rows: list, accepted: int, server: Optional[str] = None):
+    """Hand validated samples to the group-commit writer and build the response"""
+    if game not in settings.DEFAULT_THRESHOLDS:
+        return FastJSONResponse(status_code=200, content={"status": "ignored"})
 
-        # Get or create current session
-        db_session = db.query(DBSession).filter(
-            DBSession.user_id == stat.user_id,
-            DBSession.game == stat.game,
-            DBSession.end_time == None
-        ).first()
+    wait = DURABILITY == "full"
+    try:
+        item = ingest.submit(user_id, game, rows, wait=wait, server=server)
+    except QueueFull:
+        return FastJSONResponse(
+            status_code=503,
+            headers={"Retry-After": "1"},
+            content={"status": "busy", "message": "Ingest queue is full, retry shortly"}
+        )
 
-        if not db_session:
-            db_session = DBSession(
-                user_id=stat.user_id,
-                game=stat.game,
-                start_time=datetime.utcnow()
-            )
-            db.add(db_session)
-            db.commit()
-            db.refresh(db_session)
-
-        # Store network stat
-        network_stat = NetworkStat(
-            session_id=db_session.id,
-            user_id=stat.user_id,
-            ping=stat.ping,
-            jitter=stat.jitter,
-            packet_loss=stat.loss,
-            timestamp=stat.timestamp
+    if wait:
+        return FastJSONResponse(
+            status_code=200,
+            content={"status": "ok", "session_id": item.session_id, "accepted": accepted}
         )
-        db.add(network_stat)
-        db.commit()
+    return FastJSONResponse(status_code=202, content={"status": "queued", "accepted": accepted})
 
-        # Update session averages
-        all_stats = db.query(NetworkStat).filter(NetworkStat.session_id == db_session.id).all()
-        pings = [s.ping for s in all_stats]
-        jitters = [s.jitter for s in all_stats]
-        losses = [s.packet_loss for s in all_stats]
+@app.post("/stat")
+def receive_stat(stat: NetworkStatCreate):
+    try:
+        row = {
+            "ping": stat.ping,
+            "jitter": stat.jitter,
+            "packet_loss": stat.loss,
+            "timestamp": stat.timestamp,
+            "ping_ewma": stat.ping_ewma,
+            "ping_mean": stat.ping_mean,
+            "ping_p50": stat.ping_p50,
+            "ping_p95": stat.ping_p95,
+            "loss_window": stat.loss_window,
+            "server_rtt": stat.server_rtt,
+            "server_loss": stat.server_loss
+        }
+        if stat.endpoints and stat.server_rtt is None:
+            row["server_rtt"] = stat.endpoints[0].rtt
+            row["server_loss"] = stat.endpoints[0].loss
+        for name, segment in (stat.segments or {}).items():
+            if name in analysis.SEGMENTS:
+                row[f"{name}_rtt"] = segment.rtt
+                row[f"{name}_jitter"] = segment.jitter
+                row[f"{name}_loss"] = segment.loss
+        if stat.top_talkers:
+            row["top_talkers"] = stat.top_talkers.model_dump_json()
+        return enqueue_samples(stat.user_id, stat.game, [row], 1, server=stat.server)
+    except Exception as e:
+        return FastJSONResponse(status_code=500, content={"status": "error", "message": str(e)})
+
+@app.post("/stat/batch")
+def receive_stat_batch(
+    body: bytes = Body(..., media_type=wire.CONTENT_TYPE),
+    content_type: str = Header(None),
+    content_encoding: str = Header(None)
+):
+    """Bulk ingest of binary sample frames (see wire.py); skips per-sample Pydantic validation"""
+    if (content_type or "").split(";")[0].strip().lower() != wire.CONTENT_TYPE:
+        return FastJSONResponse(
+            status_code=415,
+            content={"status": "error", "message": f"Expected Content-Type {wire.CONTENT_TYPE}"}
+        )
 
-        db_session.avg_ping = statistics.mean(pings) if pings else 0
-        db_session.avg_jitter = statistics.mean(jitters) if jitters else 0
-        db_session.avg_loss = statistics.mean(losses) if losses else 0
-        db.commit()
+    try:
+        frame = wire.decode_frame(body, content_encoding)
+    except wire.WireFormatError as e:
+        return FastJSONResponse(status_code=400, content={"status": "error", "message": str(e)})
 
-        return JSONResponse(status_code=200, content={"status": "ok", "session_id": db_session.id})
+    try:
+        rows = frame.rows()
+        return enqueue_samples(frame.user_id, frame.game, rows, len(rows), server=frame.server)
     except Exception as e:
-        return JSONResponse(status_code=500, content={"status": "error", "message": str(e)})
+        return FastJSONResponse(status_code=500, content={"status": "error", "message": str(e)})
 
 # ================= SESSION MANAGEMENT =================
 @app.post("/end-session/{user_id}/{game}")
 def end_session(user_id: int, game: str, db: Session = Depends(get_db)):
     try:
-        db_session = db.query(DBSession).filter(
-            DBSession.user_id == user_id,
-            DBSession.game == game,
-            DBSession.end_time == None
-        ).first()
-
-        if db_session:
-            db_session.end_time = datetime.utcnow()
-            db.commit()
-
-        return JSONResponse(status_code=200, content={"status": "ended"})
+        # Samples the agent sent before ending must land in this session,
+        # not open a new one after it closes
+        ingest.flush()
+
+        with ingest.write_lock:
+            db_session = db.query(DBSession).filter(
+                DBSession.user_id == user_id,
+                DBSession.game == game,
+                DBSession.end_time == None
+            ).first()
+
+            if db_session:
+                analysis.finalize_session(db, db_session, end_time=datetime.utcnow())
+                db.commit()
+            ingest.forget_session(user_id, game)
+        read_cache.invalidate(user_id)
+
+        return FastJSONResponse(status_code=200, content={"status": "ended"})
     except Exception as e:
-        return JSONResponse(status_code=500, content={"status": "error", "message": str(e)})
+        return FastJSONResponse(status_code=500, content={"status": "error", "message": str(e)})
 
 @app.get("/live/{user_id}/{game}")
 def live_metrics(user_id: int, game: str, db: Session = Depends(get_db)):
@@ -202,45 +292,211 @@ def live_metrics(user_id: int, game: str, db: Session = Depends(get_db)):
         ).first()
 
         if not db_session:
-            return JSONResponse(status_code=200, content={})
+            return FastJSONResponse(status_code=200, content={})
 
         latest_stat = db.query(NetworkStat).filter(
             NetworkStat.session_id == db_session.id
         ).order_by(NetworkStat.timestamp.desc()).first()
 
         if not latest_stat:
-            return JSONResponse(status_code=200, content={})
+            return FastJSONResponse(status_code=200, content={})
 
-        return JSONResponse(
+        return FastJSONResponse(
             status_code=200,
             content={
                 "ping": latest_stat.ping,
                 "jitter": latest_stat.jitter,
                 "loss": latest_stat.packet_loss,
-                "timestamp": latest_stat.timestamp.isoformat()
+                "timestamp": latest_stat.timestamp
             }
         )
     except Exception as e:
-        return JSONResponse(status_code=500, content={"error": str(e)})
+        return FastJSONResponse(status_code=500, content={"error": str(e)})
+
+def live_sample(db: Session, user_id: int) -> Optional[dict]:
+    """Newest sample of any of the user's open sessions, or None when nothing is being played"""
+    row = db.query(
+        DBSession.game, NetworkStat.ping, NetworkStat.jitter, NetworkStat.packet_loss, NetworkStat.timestamp
+    ).join(DBSession, NetworkStat.session_id == DBSession.id).filter(
+        NetworkStat.user_id == user_id,
+        DBSession.end_time == None
+    ).order_by(NetworkStat.timestamp.desc()).first()
+
+    if not row:
+        return None
+    game, ping, jitter, loss, timestamp = row
+    return {"game": game, "ping": ping, "jitter": jitter, "loss": loss, "timestamp": timestamp}
+
+def session_summary(s: DBSession) -> dict:
+    """Inline summary for session lists, read straight from the Session row
+
+    An open session has no duration yet: the client counts it from
+    ``start_time``, which keeps the summary (and cached dashboard bodies
+    and their ETags) independent of the time it was rendered.
+    """
+    return {
+        "id": s.id,
+        "game": s.game,
+        "start_time": s.start_time,
+        "end_time": s.end_time,
+        "open": s.end_time is None,
+        "duration": round((s.end_time - s.start_time).total_seconds()) if s.end_time else None,
+        "avg_ping": round(s.avg_ping or 0, 2),
+        "avg_jitter": round(s.avg_jitter or 0, 2),
+        "avg_loss": round(s.avg_loss or 0, 2),
+        "verdict": s.verdict,
+        "samples": s.sample_count,
+        "server": s.server
+    }
+
+def query_sessions_page(db: Session, user_id: int, game: str, cursor: Optional[int], limit: int,
+                        server: Optional[str] = None):
+    """One page of a user's sessions for a game, newest first; returns (rows, next_cursor)"""
+    query = db.query(DBSession).filter(
+        DBSession.user_id == user_id,
+        DBSession.game == game
+    )
+    if server is not None:
+        query = query.filter(DBSession.server == server)
+    if cursor is not None:
+        query = query.filter(DBSession.id < cursor)
+
+    # Ids grow with start time, so ordering by id walks ix_sessions_user_game_id
+    rows = query.order_by(DBSession.id.desc()).limit(limit + 1).all()
+    next_cursor = rows[limit - 1].id if len(rows) > limit else None
+    return rows[:limit], next_cursor
 
 @app.get("/sessions/{user_id}/{game}")
-def list_sessions(user_id: int, game: str, db: Session = Depends(get_db)):
+def list_sessions(
+    user_id: int,
+    game: str,
+    cursor: Optional[int] = None,
+    limit: int = Query(20, ge=1, le=100),
+    server: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
     try:
-        db_sessions = db.query(DBSession).filter(
-            DBSession.user_id == user_id,
-            DBSession.game == game
-        ).order_by(DBSession.start_time.desc()).all()
+        rows, next_cursor = query_sessions_page(db, user_id, game, cursor, limit, server)
 
-        return JSONResponse(
+        return FastJSONResponse(
             status_code=200,
-            content=[s.start_time.isoformat() for s in db_sessions]
+            content={
+                "sessions": [session_summary(s) for s in rows],
+                "next_cursor": next_cursor
+            }
         )
     except Exception as e:
-        return JSONResponse(status_code=500, content={"error": str(e)})
+        return FastJSONResponse(status_code=500, content={"error": str(e)})
 
 # ================= SESSION ANALYSIS =================
+def server_baseline(db: Session, db_session: DBSession) -> Optional[dict]:
+    """The user's other ended sessions of this game on the same server, for a like-for-like comparison"""
+    if not db_session.server:
+        return None
+
+    count, avg_ping, avg_jitter, avg_loss = db.query(
+        func.count(DBSession.id),
+        func.avg(DBSession.avg_ping),
+        func.avg(DBSession.avg_jitter),
+        func.avg(DBSession.avg_loss)
+    ).filter(
+        DBSession.user_id == db_session.user_id,
+        DBSession.game == db_session.game,
+        DBSession.server == db_session.server,
+        DBSession.end_time != None,
+        DBSession.id != db_session.id
+    ).one()
+
+    if not count:
+        return None
+    return {
+        "sessions": count,
+        "avg_ping": round(avg_ping or 0, 2),
+        "avg_jitter": round(avg_jitter or 0, 2),
+        "avg_loss": round(avg_loss or 0, 2)
+    }
+
+def session_analysis(db: Session, db_session: DBSession) -> FastJSONResponse:
+    """Verdict, reasons and timeline for one session"""
+    # Plain column tuples: no ORM objects to build per sample
+    segment_columns = [getattr(NetworkStat, name) for name in wire.SEGMENT_COLUMNS]
+    rows = db.query(
+        NetworkStat.timestamp, NetworkStat.ping, NetworkStat.jitter, NetworkStat.packet_loss,
+        NetworkStat.server_rtt, *segment_columns
+    ).filter(NetworkStat.session_id == db_session.id).all()
+
+    if not rows:
+        return FastJSONResponse(status_code=200, content={"error": "No data in session"})
+
+    times, pings, jitters, losses, server_rtts, *segment_values = zip(*rows)
+    pings = np.array(pings, dtype=np.float64)
+    # NULL (older agents, unanswered probes) becomes NaN and is skipped
+    server_rtts = np.array(server_rtts, dtype=np.float64)
+    avg_server_rtt = float(np.nanmean(server_rtts)) if np.isfinite(server_rtts).any() else None
+
+    avg_ping = float(pings.mean())
+    avg_jitter = float(np.mean(jitters))
+    avg_loss = float(np.mean(losses))
+
+    thresholds = settings.get_game_threshold(db, db_session.user_id, db_session.game)
+
+    verdict, optimizer = analysis.score(avg_ping, avg_jitter, avg_loss, thresholds)
+    # wire.SEGMENT_COLUMNS is (rtt, jitter, loss) for each segment in order
+    attribution = analysis.attribute_segments(
+        {name: segment_values[i * 3:i * 3 + 3] for i, name in enumerate(analysis.SEGMENTS)},
+        thresholds
+    )
+    talkers = analysis.spike_talkers([
+        summary for (summary,) in db.query(NetworkStat.top_talkers).filter(
+            NetworkStat.session_id == db_session.id,
+            NetworkStat.top_talkers != None
+        )
+    ])
+    reasons = analysis.reasons(avg_ping, avg_jitter, avg_loss, float(np.ptp(pings)), thresholds,
+                               attribution, talkers)
+
+    db_session.verdict = verdict
+    db.commit()
+
+    return FastJSONResponse(
+        status_code=200,
+        content={
+            "id": db_session.id,
+            "verdict": verdict,
+            "optimizer": optimizer,
+            "reasons": reasons,
+            "avg_ping": round(avg_ping, 2),
+            "avg_jitter": round(avg_jitter, 2),
+            "avg_loss": round(avg_loss, 2),
+            "server": db_session.server,
+            "avg_server_rtt": round(avg_server_rtt, 2) if avg_server_rtt is not None else None,
+            "server_baseline": server_baseline(db, db_session),
+            "attribution": attribution,
+            "spike_talkers": talkers,
+            # Datetimes are serialized by the response class
+            "timeline": [
+                {"time": t, "ping": p, "jitter": j, "loss": l}
+                for t, p, j, l in zip(times, pings.tolist(), jitters, losses)
+            ]
+        }
+    )
+
+@app.get("/session/{user_id}/{session_id}")
+def analyze_session_by_id(user_id: int, session_id: int, db: Session = Depends(get_db)):
+    try:
+        # Primary-key lookup; the user_id check keeps sessions private per user
+        db_session = db.get(DBSession, session_id)
+
+        if not db_session or db_session.user_id != user_id:
+            return FastJSONResponse(status_code=404, content={"error": "Session not found"})
+
+        return session_analysis(db, db_session)
+    except Exception as e:
+        return FastJSONResponse(status_code=500, content={"error": str(e)})
+
 @app.get("/session/{user_id}/{game}/{session_id}")
 def analyze_session(user_id: int, game: str, session_id: str, db: Session = Depends(get_db)):
+    """Legacy lookup by start_time string; prefer /session/{user_id}/{session_id}"""
     try:
         db_session = db.query(DBSession).filter(
             DBSession.user_id == user_id,
@@ -249,134 +505,168 @@ def analyze_session(user_id: int, game: str, session_id: str, db: Session = Depe
         ).first()
 
         if not db_session:
-            return JSONResponse(status_code=404, content={"error": "Session not found"})
-
-        all_stats = db.query(NetworkStat).filter(NetworkStat.session_id == db_session.id).all()
-
-        if not all_stats:
-            return JSONResponse(status_code=200, content={"error": "No data in session"})
-
-        pings = [s.ping for s in all_stats]
-        jitters = [s.jitter for s in all_stats]
-        losses = [s.packet_loss for s in all_stats]
-
-        avg_ping = statistics.mean(pings)
-        avg_jitter = statistics.mean(jitters)
-        avg_loss = statistics.mean(losses)
-
-        thresholds = settings.get_game_threshold(db, user_id, game)
-
-        score = sum([
-            avg_ping > thresholds["ping"],
-            avg_jitter > thresholds["jitter"],
-            avg_loss > thresholds["loss"]
-        ])
+            return FastJSONResponse(status_code=404, content={"error": "Session not found"})
 
-        verdict = ["Good", "Average", "Bad"][min(score, 2)]
-        optimizer = avg_jitter > thresholds["jitter"] or avg_loss > thresholds["loss"]
-
-        reasons = []
-        if avg_ping > thresholds["ping"] and avg_jitter <= thresholds["jitter"]:
-            reasons.append("High base latency – distant servers or inefficient ISP routing")
-        if avg_jitter > thresholds["jitter"]:
-            reasons.append("High jitter – unstable routing or Wi-Fi interference")
-        if avg_loss > thresholds["loss"]:
-            reasons.append("Packet loss detected – ISP congestion or poor routing")
-        if max(pings) - min(pings) > thresholds["ping"]:
-            reasons.append("Ping spikes – background downloads or wireless drops")
-        if not reasons:
-            reasons.append("No major network issues detected")
+        return session_analysis(db, db_session)
+    except Exception as e:
+        return FastJSONResponse(status_code=500, content={"error": str(e)})
+
+# ================= ANOMALIES =================
+def anomaly_summary(e: AnomalyEvent) -> dict:
+    return {
+        "id": e.id,
+        "session_id": e.session_id,
+        "game": e.game,
+        "metric": e.metric,
+        "value": e.value,
+        "baseline": e.baseline,
+        "zscore": e.zscore,
+        "timestamp": e.timestamp
+    }
+
+@app.get("/anomalies/{user_id}")
+def list_anomalies(
+    user_id: int,
+    session_id: Optional[int] = None,
+    cursor: Optional[int] = None,
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db)
+):
+    """Anomaly events detected during ingest, newest first"""
+    try:
+        query = db.query(AnomalyEvent).filter(AnomalyEvent.user_id == user_id)
+        if session_id is not None:
+            query = query.filter(AnomalyEvent.session_id == session_id)
+        if cursor is not None:
+            query = query.filter(AnomalyEvent.id < cursor)
 
-        db_session.verdict = verdict
-        db.commit()
+        rows = query.order_by(AnomalyEvent.id.desc()).limit(limit + 1).all()
+        next_cursor = rows[limit - 1].id if len(rows) > limit else None
 
-        return JSONResponse(
+        return FastJSONResponse(
             status_code=200,
-            content={
-                "verdict": verdict,
-                "optimizer": optimizer,
-                "reasons": reasons,
-                "avg_ping": round(avg_ping, 2),
-                "avg_jitter": round(avg_jitter, 2),
-                "avg_loss": round(avg_loss, 2),
-                "timeline": [
-                    {"time": s.timestamp.isoformat(), "ping": s.ping, "jitter": s.jitter, "loss": s.packet_loss}
-                    for s in all_stats
-                ]
-            }
+            content={"events": [anomaly_summary(e) for e in rows[:limit]], "next_cursor": next_cursor}
         )
     except Exception as e:
-        return JSONResponse(status_code=500, content={"error": str(e)})
+        return FastJSONResponse(status_code=500, content={"error": str(e)})
+
+@app.get("/anomalies/{user_id}/stream")
+async def stream_anomalies(user_id: int):
+    """Server-sent events: one 'anomaly' event per detection, as it is committed"""
+    detector = ingest.detector
+
+    async def events():
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=100)
+        detector.subscribe(user_id, loop, queue)
+        try:
+            yield ": connected\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    # Keeps proxies from closing an idle stream
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: anomaly\ndata: {dumps(event).decode()}\n\n"
+        finally:
+            detector.unsubscribe(user_id, loop, queue)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# ================= EXPORT =================
+@app.get("/export/{user_id}")
+def export_stats(
+    user_id: int,
+    format: str = "csv",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    game: Optional[str] = None
+):
+    """Stream the user's samples in [start, end) as CSV, NDJSON or Parquet"""
+    try:
+        export.check_format(format)
+    except export.ExportFormatError as e:
+        return FastJSONResponse(status_code=400, content={"error": str(e)})
+
+    filename = f"lagsense_{user_id}{'_' + game if game else ''}.{format}"
+    return StreamingResponse(
+        export.export_stream(user_id, format, start, end, game),
+        media_type=export.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
 
 # ================= USER STATISTICS =================
+def user_statistics(db: Session, user_id: int) -> dict:
+    """Totals and best / worst game over all of a user's sessions"""
+    all_sessions = db.query(DBSession).filter(DBSession.user_id == user_id).all()
+
+    if not all_sessions:
+        return {
+            "total_sessions": 0,
+            "avg_ping": 0,
+            "avg_jitter": 0,
+            "avg_loss": 0,
+            "best_game": "N/A",
+            "worst_game": "N/A",
+            "total_play_time": 0
+        }
+
+    all_pings = [s.avg_ping for s in all_sessions if s.avg_ping > 0]
+    all_jitters = [s.avg_jitter for s in all_sessions if s.avg_jitter > 0]
+    all_losses = [s.avg_loss for s in all_sessions if s.avg_loss > 0]
+
+    total_play_time = sum([
+        (s.end_time - s.start_time).total_seconds() / 3600
+        for s in all_sessions if s.end_time
+    ])
+
+    games = {}
+    for sess in all_sessions:
+        if sess.game not in games:
+            games[sess.game] = []
+        games[sess.game].append(sess.avg_ping)
+
+    best_game = min(games.items(), key=lambda x: statistics.mean(x[1]))[0] if games else "N/A"
+    worst_game = max(games.items(), key=lambda x: statistics.mean(x[1]))[0] if games else "N/A"
+
+    return {
+        "total_sessions": len(all_sessions),
+        "avg_ping": round(statistics.mean(all_pings), 2) if all_pings else 0,
+        "avg_jitter": round(statistics.mean(all_jitters), 2) if all_jitters else 0,
+        "avg_loss": round(statistics.mean(all_losses), 2) if all_losses else 0,
+        "best_game": best_game,
+        "worst_game": worst_game,
+        "total_play_time": round(total_play_time, 2)
+    }
+
 @app.get("/statistics/{user_id}")
 def get_statistics(user_id: int, db: Session = Depends(get_db)):
     try:
-        all_sessions = db.query(DBSession).filter(DBSession.user_id == user_id).all()
-
-        if not all_sessions:
-            return JSONResponse(
-                status_code=200,
-                content={
-                    "total_sessions": 0,
-                    "avg_ping": 0,
-                    "avg_jitter": 0,
-                    "avg_loss": 0,
-                    "best_game": "N/A",
-                    "worst_game": "N/A",
-                    "total_play_time": 0
-                }
-            )
-
-        all_pings = [s.avg_ping for s in all_sessions if s.avg_ping > 0]
-        all_jitters = [s.avg_jitter for s in all_sessions if s.avg_jitter > 0]
-        all_losses = [s.avg_loss for s in all_sessions if s.avg_loss > 0]
-
-        total_play_time = sum([
-            (s.end_time - s.start_time).total_seconds() / 3600
-            for s in all_sessions if s.end_time
-        ])
-
-        games = {}
-        for sess in all_sessions:
-            if sess.game not in games:
-                games[sess.game] = []
-            games[sess.game].append(sess.avg_ping)
-
-        best_game = min(games.items(), key=lambda x: statistics.mean(x[1]))[0] if games else "N/A"
-        worst_game = max(games.items(), key=lambda x: statistics.mean(x[1]))[0] if games else "N/A"
-
-        return JSONResponse(
-            status_code=200,
-            content={
-                "total_sessions": len(all_sessions),
-                "avg_ping": round(statistics.mean(all_pings), 2) if all_pings else 0,
-                "avg_jitter": round(statistics.mean(all_jitters), 2) if all_jitters else 0,
-                "avg_loss": round(statistics.mean(all_losses), 2) if all_losses else 0,
-                "best_game": best_game,
-                "worst_game": worst_game,
-                "total_play_time": round(total_play_time, 2)
-            }
-        )
+        content = read_cache.get(user_id, "statistics", lambda: user_statistics(db, user_id))
+        return FastJSONResponse(status_code=200, content=content)
     except Exception as e:
-        return JSONResponse(status_code=500, content={"error": str(e)})
+        return FastJSONResponse(status_code=500, content={"error": str(e)})
 
 # ================= USER SETTINGS =================
+def user_settings(db: Session, user_id: int) -> dict:
+    """Thresholds and notification preferences (created with defaults on first read)"""
+    return {
+        "thresholds": settings.get_user_thresholds(db, user_id),
+        "notifications": settings.get_notification_settings(db, user_id)
+    }
+
 @app.get("/settings/{user_id}")
 def get_settings(user_id: int, db: Session = Depends(get_db)):
     try:
-        thresholds = settings.get_user_thresholds(db, user_id)
-        notifications = settings.get_notification_settings(db, user_id)
-
-        return JSONResponse(
-            status_code=200,
-            content={
-                "thresholds": thresholds,
-                "notifications": notifications
-            }
-        )
+        content = read_cache.get(user_id, "settings", lambda: user_settings(db, user_id))
+        return FastJSONResponse(status_code=200, content=content)
     except Exception as e:
-        return JSONResponse(status_code=500, content={"error": str(e)})
+        return FastJSONResponse(status_code=500, content={"error": str(e)})
 
 @app.put("/settings/{user_id}")
 def update_settings(user_id: int, data: dict, db: Session = Depends(get_db)):
@@ -400,24 +690,84 @@ def update_settings(user_id: int, data: dict, db: Session = Depends(get_db)):
                 notif.get("ping_alert_threshold")
             )
 
-        return JSONResponse(
-            status_code=200,
-            content={"success": True, "message": "Settings updated"}
+        read_cache.invalidate(user_id)
+        content = {"success": True, "message": "Settings updated"}
+        if "thresholds" in data:
+            # Stored verdicts were scored against the old thresholds
+            content["rescore_job"] = rescore_jobs.submit(user_id)
+
+        return FastJSONResponse(status_code=200, content=content)
+    except Exception as e:
+        # Some updates may have been committed before the failure
+        read_cache.invalidate(user_id)
+        return FastJSONResponse(status_code=500, content={"success": False, "message": str(e)})
+
+@app.get("/rescore/{user_id}/{job_id}")
+def rescore_progress(user_id: int, job_id: int):
+    """Progress of a verdict re-score job started by PUT /settings"""
+    job = rescore_jobs.get(job_id)
+    if not job or job["user_id"] != user_id:
+        return FastJSONResponse(status_code=404, content={"error": "Job not found"})
+    return FastJSONResponse(status_code=200, content=job)
+
+# ================= DASHBOARD =================
+def render_dashboard(db: Session, user_id: int, game: Optional[str], limit: int):
+    """Serialized /dashboard body and its ETag, built from the cached per-user results"""
+    live = read_cache.get(user_id, "live", lambda: live_sample(db, user_id))
+    if game is None:
+        # The game being played, else the last one played
+        latest = db.query(DBSession.game).filter(DBSession.user_id == user_id).order_by(DBSession.id.desc()).first()
+        game = live["game"] if live else latest[0] if latest else next(iter(settings.DEFAULT_THRESHOLDS))
+    rows, next_cursor = query_sessions_page(db, user_id, game, None, limit)
+
+    body = dumps({
+        "settings": read_cache.get(user_id, "settings", lambda: user_settings(db, user_id)),
+        "statistics": read_cache.get(user_id, "statistics", lambda: user_statistics(db, user_id)),
+        "game": game,
+        "sessions": {
+            "sessions": [session_summary(s) for s in rows],
+            "next_cursor": next_cursor
+        },
+        "live": live
+    })
+    return etag_for(body), body
+
+@app.get("/dashboard/{user_id}")
+def dashboard(
+    user_id: int,
+    game: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=100),
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
+    """Settings, statistics, first sessions page and live sample in one round trip
+
+    Answers 304 when If-None-Match still matches, so a reload of an
+    unchanged dashboard costs no body at all.
+    """
+    try:
+        etag, body = read_cache.get(
+            user_id, ("dashboard", game, limit), lambda: render_dashboard(db, user_id, game, limit)
         )
+        # no-cache: the browser keeps the body but revalidates every load
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
     except Exception as e:
-        return JSONResponse(status_code=500, content={"success": False, "message": str(e)})
+        return FastJSONResponse(status_code=500, content={"error": str(e)})
 
 # ================= HEALTH CHECK =================
 @app.get("/")
 def root():
-    return JSONResponse(
+    return FastJSONResponse(
         status_code=200,
         content={"status": "LagSense backend running"}
     )
 
 @app.get("/health")
 def health():
-    return JSONResponse(
+    return FastJSONResponse(
         status_code=200,
         content={"status": "healthy"}
     )
\ No newline at end of file
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, EmailStr
 from datetime import datetime
-from typing import Optional, List
+from typing import Optional, List, Dict
 
 # ================= USER MODELS =================
 class UserBase(BaseModel):
@@ -32,6 +32,30 @@ class AuthResponse(BaseModel):
     message: Optional[str] = None
 
 # ================= NETWORK STAT MODELS =================
+class EndpointStat(BaseModel):
+    proto: str
+    host: str
+    port: int
+    rtt: Optional[float] = None
+    loss: Optional[float] = None
+
+class SegmentStat(BaseModel):
+    rtt: Optional[float] = None
+    jitter: Optional[float] = None
+    loss: Optional[float] = None
+
+class Talker(BaseModel):
+    name: str
+    pid: int
+    kbps: float
+
+class TopTalkers(BaseModel):
+    down_kbps: float
+    up_kbps: float
+    # "tcp": socket byte counters; "io": process I/O counters (disk included)
+    source: Optional[str] = None
+    top: List[Talker] = []
+
 class NetworkStatCreate(BaseModel):
     user_id: int
     game: str
@@ -40,6 +64,26 @@ class NetworkStatCreate(BaseModel):
     loss: float
     timestamp: datetime
 
+    # Streaming statistics sent by newer agents
+    ping_ewma: Optional[float] = None
+    ping_mean: Optional[float] = None
+    ping_p50: Optional[float] = None
+    ping_p95: Optional[float] = None
+    loss_window: Optional[float] = None
+
+    # Game server the agent discovered ("host:port") and its probe results;
+    # endpoints lists every probed endpoint, the first one is the server
+    server: Optional[str] = None
+    server_rtt: Optional[float] = None
+    server_loss: Optional[float] = None
+    endpoints: Optional[List[EndpointStat]] = None
+
+    # Path segments probed in the same tick, keyed "lan", "isp", "remote"
+    segments: Optional[Dict[str, SegmentStat]] = None
+
+    # Busiest processes, sent with samples where the RTT spiked
+    top_talkers: Optional[TopTalkers] = None
+
 class NetworkStatResponse(BaseModel):
     id: int
     session_id: int
@@ -70,6 +114,7 @@ class SessionResponse(BaseModel):
     avg_ping: float
     avg_jitter: float
     avg_loss: float
+    server: Optional[str] = None
 
     class Config:
         from_attributes = True
@@ -0,0 +1,103 @@
+import os
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+
+from database import Session as DBSession, NetworkStat
+from analysis import finalize_session
+
+# Sessions with no samples for this long are closed; the scan runs every
+# REAP_INTERVAL seconds
+SESSION_IDLE_SECONDS = int(os.environ.get("LAGSENSE_SESSION_IDLE_SECONDS", "600"))
+REAP_INTERVAL = int(os.environ.get("LAGSENSE_REAP_INTERVAL", "60"))
+
+
+class SessionReaper:
+    """Closes sessions whose agent went away without calling /end-session.
+
+    Works off the ingest queue's in-memory open-session index (seeded from
+    the database at start), so a scan costs nothing when every session is
+    live. A stale session is closed at its last sample's time and goes
+    through the same end-of-session pipeline as /end-session.
+
+    The index only sees samples this process wrote, so the database has
+    the last word: a session with samples newer than the index knows
+    about is left open and its entry refreshed.
+    """
+
+    def __init__(self, ingest, idle_seconds=SESSION_IDLE_SECONDS, interval=REAP_INTERVAL):
+        self.ingest = ingest
+        self.idle = timedelta(seconds=idle_seconds)
+        self.interval = interval
+        self.reaped = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self.ingest.seed_open_index()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="session-reaper", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=10):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.reap()
+            except Exception as e:
+                print(f"✗ Session reaper failed: {e}")
+
+    def stale_sessions(self, now=None):
+        """Ids of open sessions idle for longer than the idle period"""
+        cutoff = (now or datetime.utcnow()) - self.idle
+        return [
+            session_id for session_id, entry in list(self.ingest.open_index.items())
+            if entry.last_seen < cutoff
+        ]
+
+    def reap(self, now=None):
+        """Close every stale session; returns how many were closed"""
+        candidates = self.stale_sessions(now)
+        if not candidates:
+            return 0
+
+        closed = 0
+        # Hold the writer off so no batch lands in a session as it closes
+        with self.ingest.write_lock:
+            cutoff = (now or datetime.utcnow()) - self.idle
+            db = self.ingest.session_factory()
+            try:
+                for session_id in candidates:
+                    entry = self.ingest.open_index.get(session_id)
+                    if entry is None or entry.last_seen >= cutoff:
+                        continue
+                    db_session = db.get(DBSession, session_id)
+                    if db_session is not None and db_session.end_time is None:
+                        last_sample = db.query(func.max(NetworkStat.timestamp)).filter(
+                            NetworkStat.session_id == session_id
+                        ).scalar()
+                        if last_sample is not None and last_sample > entry.last_sample:
+                            # Written elsewhere since; not stale after all
+                            entry.last_sample = last_sample
+                            entry.last_seen = datetime.utcnow()
+                            db.rollback()
+                            continue
+                        finalize_session(db, db_session, end_time=entry.last_sample)
+                        db.commit()
+                        self.ingest.changed({entry.user_id})
+                        closed += 1
+                    self.ingest.forget_session(entry.user_id, entry.game, session_id)
+            finally:
+                db.close()
+
+        if closed:
+            self.reaped += closed
+            print(f"✓ Reaped {closed} stale session(s)")
+        return closed
@@ -0,0 +1,132 @@
+import threading
+import itertools
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import update, or_, and_
+
+from database import SessionLocal, Session as DBSession
+from analysis import score_many
+import settings
+
+# Finished jobs kept around for progress queries
+MAX_FINISHED_JOBS = 200
+
+
+class RescoreJobs:
+    """Background re-verdict jobs, run after a user changes thresholds.
+
+    A job re-scores every ended session of one user from the aggregates
+    already stored on the Session rows, so no samples are read. The
+    scoring is one NumPy pass and changed verdicts go back in a single
+    bulk UPDATE by primary key. Progress lives in memory and is read
+    through ``get``. ``on_change`` is called with the user id when a job
+    changed any verdicts.
+    """
+
+    def __init__(self, on_change=None):
+        self.on_change = on_change
+        self._jobs = OrderedDict()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rescore")
+
+    def submit(self, user_id):
+        """Queue a re-score for the user; returns the job's progress dict"""
+        with self._lock:
+            # A job that hasn't started yet will already see the new thresholds
+            for job in self._jobs.values():
+                if job["user_id"] == user_id and job["status"] == "queued":
+                    return dict(job)
+
+            job = {
+                "job_id": next(self._ids),
+                "user_id": user_id,
+                "status": "queued",
+                "total": None,
+                "scored": 0,
+                "changed": 0,
+                "queued_at": datetime.utcnow(),
+                "finished_at": None,
+                "error": None
+            }
+            self._jobs[job["job_id"]] = job
+            self._trim()
+        self._executor.submit(self._run, job)
+        return dict(job)
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def _trim(self):
+        finished = [jid for jid, job in self._jobs.items() if job["status"] in ("done", "failed")]
+        for jid in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[jid]
+
+    def _update(self, job, **fields):
+        with self._lock:
+            job.update(fields)
+
+    def _run(self, job):
+        self._update(job, status="running")
+        try:
+            total, changed = rescore_user(job["user_id"], progress=lambda **f: self._update(job, **f))
+            self._update(job, status="done", total=total, scored=total, changed=changed)
+            if changed and self.on_change is not None:
+                self.on_change(job["user_id"])
+        except Exception as e:
+            self._update(job, status="failed", error=str(e))
+            print(f"✗ Re-score job {job['job_id']} failed: {e}")
+        finally:
+            self._update(job, finished_at=datetime.utcnow())
+
+
+def rescore_user(user_id, progress=None):
+    """Re-score the user's ended sessions against their current thresholds; returns (scored, changed)"""
+    progress = progress or (lambda **fields: None)
+    db = SessionLocal()
+    try:
+        thresholds = settings.get_user_thresholds(db, user_id)
+
+        rows = db.query(
+            DBSession.id, DBSession.game, DBSession.verdict,
+            DBSession.avg_ping, DBSession.avg_jitter, DBSession.avg_loss
+        ).filter(
+            DBSession.user_id == user_id,
+            DBSession.end_time != None,
+            # Sessions without samples keep their "Unknown" verdict
+            or_(DBSession.sample_count > 0, and_(DBSession.sample_count == None, DBSession.avg_ping > 0))
+        ).all()
+        progress(total=len(rows))
+        if not rows:
+            return 0, 0
+
+        ids, games, current, pings, jitters, losses = zip(*rows)
+        limits = [
+            thresholds.get(game, settings.DEFAULT_THRESHOLDS.get(game, settings.FALLBACK_THRESHOLD))
+            for game in games
+        ]
+        verdicts = score_many(
+            np.array(pings, dtype=np.float64),
+            np.array(jitters, dtype=np.float64),
+            np.array(losses, dtype=np.float64),
+            np.array([t["ping"] for t in limits], dtype=np.float64),
+            np.array([t["jitter"] for t in limits], dtype=np.float64),
+            np.array([t["loss"] for t in limits], dtype=np.float64)
+        )
+        progress(scored=len(rows))
+
+        changed = np.flatnonzero(verdicts != np.array(current, dtype=object))
+        if len(changed):
+            db.execute(update(DBSession), [{"id": ids[i], "verdict": verdicts[i]} for i in changed])
+            db.commit()
+        return len(rows), len(changed)
+    finally:
+        db.close()
@@ -0,0 +1,59 @@
+import json
+from datetime import date, datetime
+
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Bodies smaller than this aren't worth compressing
+COMPRESS_MIN_BYTES = 1024
+
+
+def _default(value):
+    """stdlib fallback for what orjson handles natively"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if hasattr(value, "tolist"):
+        # NumPy arrays and scalars
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content) -> bytes:
+    """Serialize content to JSON bytes; datetimes and NumPy values are handled directly"""
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(
+        content,
+        default=_default,
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson when it's installed.
+
+    Handlers can return datetimes and NumPy arrays as-is instead of
+    calling .isoformat() / .tolist() per value.
+    """
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+def add_compression(app):
+    """Compress large responses: brotli when brotli-asgi is installed, gzip otherwise"""
+    try:
+        from brotli_asgi import BrotliMiddleware
+    except ImportError:
+        app.add_middleware(GZipMiddleware, minimum_size=COMPRESS_MIN_BYTES)
+        return "gzip"
+    # Falls back to gzip for clients that don't accept br
+    app.add_middleware(BrotliMiddleware, minimum_size=COMPRESS_MIN_BYTES, gzip_fallback=True)
+    return "br"
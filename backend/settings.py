@@ -9,6 +9,8 @@ DEFAULT_THRESHOLDS = {
     "fortnite": {"ping": 80, "jitter": 18, "loss": 2.0},
     "discord": {"ping": 50, "jitter": 8, "loss": 0.5},
 }
+# For games without their own thresholds
+FALLBACK_THRESHOLD = {"ping": 100, "jitter": 20, "loss": 5}
 
 def get_or_create_user_settings(db: Session, user_id: int) -> UserSettings:
     """Get user settings or create defaults"""
@@ -22,10 +24,7 @@ def get_or_create_user_settings(db: Session, user_id: int) -> UserSettings:
     
     return settings
 
-def get_user_thresholds(db: Session, user_id: int) -> dict:
-    """Get all game thresholds for a user"""
-    settings = get_or_create_user_settings(db, user_id)
-    
+def _thresholds(settings: UserSettings) -> dict:
     return {
         "valorant": {"ping": settings.valorant_ping, "jitter": settings.valorant_jitter, "loss": settings.valorant_loss},
         "cs2": {"ping": settings.cs2_ping, "jitter": settings.cs2_jitter, "loss": settings.cs2_loss},
@@ -34,10 +33,24 @@ def get_user_thresholds(db: Session, user_id: int) -> dict:
         "discord": {"ping": settings.discord_ping, "jitter": settings.discord_jitter, "loss": settings.discord_loss},
     }
 
+def get_user_thresholds(db: Session, user_id: int) -> dict:
+    """Get all game thresholds for a user"""
+    return _thresholds(get_or_create_user_settings(db, user_id))
+
 def get_game_threshold(db: Session, user_id: int, game: str) -> dict:
     """Get threshold for specific game"""
     thresholds = get_user_thresholds(db, user_id)
-    return thresholds.get(game, DEFAULT_THRESHOLDS.get(game, {"ping": 100, "jitter": 20, "loss": 5}))
+    return thresholds.get(game, DEFAULT_THRESHOLDS.get(game, FALLBACK_THRESHOLD))
+
+def find_game_threshold(db: Session, user_id: int, game: str) -> dict:
+    """Threshold for a game without creating (and committing) a settings row
+
+    For callers inside a larger transaction; users without settings get
+    the defaults.
+    """
+    settings = db.query(UserSettings).filter(UserSettings.user_id == user_id).first()
+    thresholds = _thresholds(settings) if settings else DEFAULT_THRESHOLDS
+    return thresholds.get(game, DEFAULT_THRESHOLDS.get(game, FALLBACK_THRESHOLD))
 
 def update_game_threshold(db: Session, user_id: int, game: str, ping: float, jitter: float, loss: float) -> bool:
     """Update threshold for specific game"""
@@ -0,0 +1,181 @@
+import zlib
+import struct
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+# Compact agent -> backend sample framing.
+#
+# Frame = header + game name [+ server] + N fixed-size records, all little-endian:
+#   header  magic "LSW1", version u8, flags u8, user_id u32,
+#           base_ts f64 (unix seconds, UTC), count u32, game_len u8
+#   server  server_len u8 + "host:port" (only when FLAG_SERVER is set)
+#   record  dt_ms u32 (since base_ts), ping f32, jitter f32, loss f32
+#           [+ ping_ewma f32, ping_p50 f32, ping_p95 f32, loss_window f32
+#            when FLAG_EXTENDED is set]
+#           [+ server_rtt f32, server_loss f32 (NaN = unknown)
+#            when FLAG_SERVER is set]
+#           [+ rtt f32, jitter f32, loss f32 for each of lan, isp, remote
+#            (NaN = not measured) when FLAG_SEGMENTS is set]
+#           [+ ping_mean f32 when FLAG_MEAN is set]
+#
+# The body may be compressed; the agent says so with Content-Encoding.
+
+CONTENT_TYPE = "application/vnd.lagsense.samples"
+
+MAGIC = b"LSW1"
+VERSION = 1
+FLAG_EXTENDED = 0x01
+FLAG_SERVER = 0x02
+FLAG_SEGMENTS = 0x04
+FLAG_MEAN = 0x08
+
+HEADER = struct.Struct("<4sBBIdIB")
+
+RECORD_DTYPE = np.dtype([
+    ("dt_ms", "<u4"),
+    ("ping", "<f4"),
+    ("jitter", "<f4"),
+    ("loss", "<f4"),
+])
+EXTENDED_RECORD_DTYPE = np.dtype(RECORD_DTYPE.descr + [
+    ("ping_ewma", "<f4"),
+    ("ping_p50", "<f4"),
+    ("ping_p95", "<f4"),
+    ("loss_window", "<f4"),
+])
+SERVER_FIELDS = [
+    ("server_rtt", "<f4"),
+    ("server_loss", "<f4"),
+]
+SEGMENT_COLUMNS = [
+    f"{segment}_{metric}"
+    for segment in ("lan", "isp", "remote")
+    for metric in ("rtt", "jitter", "loss")
+]
+SEGMENT_FIELDS = [(name, "<f4") for name in SEGMENT_COLUMNS]
+MEAN_FIELDS = [
+    ("ping_mean", "<f4"),
+]
+
+# Upper bound on a decompressed frame, so a tiny gzip bomb can't eat memory
+MAX_FRAME_BYTES = 4 * 1024 * 1024
+
+
+def record_dtype(flags):
+    """Record layout for a frame's flags"""
+    dtype = EXTENDED_RECORD_DTYPE if flags & FLAG_EXTENDED else RECORD_DTYPE
+    if flags & FLAG_SERVER:
+        dtype = np.dtype(dtype.descr + SERVER_FIELDS)
+    if flags & FLAG_SEGMENTS:
+        dtype = np.dtype(dtype.descr + SEGMENT_FIELDS)
+    if flags & FLAG_MEAN:
+        dtype = np.dtype(dtype.descr + MEAN_FIELDS)
+    return dtype
+
+
+class WireFormatError(ValueError):
+    pass
+
+
+@dataclass
+class Frame:
+    user_id: int
+    game: str
+    base_ts: float
+    records: np.ndarray
+    server: Optional[str] = None
+
+    def rows(self):
+        """NetworkStat rows (without session/user ids) for a bulk INSERT, built column-wise"""
+        base = np.datetime64(int(self.base_ts * 1_000_000), "us")
+        timestamps = (base + self.records["dt_ms"].astype("timedelta64[ms]")).astype("datetime64[us]").tolist()
+
+        # float32 on the wire; round back to the precision the agent sent
+        columns = {
+            "ping": np.round(self.records["ping"].astype(np.float64), 2).tolist(),
+            "jitter": np.round(self.records["jitter"].astype(np.float64), 2).tolist(),
+            "packet_loss": np.round(self.records["loss"].astype(np.float64), 2).tolist(),
+        }
+        fields = self.records.dtype.names
+        if "ping_p95" in fields:
+            for name in ("ping_ewma", "ping_p50", "ping_p95", "loss_window"):
+                columns[name] = np.round(self.records[name].astype(np.float64), 2).tolist()
+        if "ping_mean" in fields:
+            columns["ping_mean"] = np.round(self.records["ping_mean"].astype(np.float64), 2).tolist()
+        # Optional columns where NaN means "not measured"
+        nullable = []
+        if "server_rtt" in fields:
+            nullable += ["server_rtt", "server_loss"]
+        if "lan_rtt" in fields:
+            nullable += SEGMENT_COLUMNS
+        for name in nullable:
+            values = np.round(self.records[name].astype(np.float64), 2)
+            columns[name] = [None if v != v else v for v in values.tolist()]
+
+        names = list(columns)
+        return [
+            dict(zip(names, values), timestamp=ts)
+            for ts, *values in zip(timestamps, *columns.values())
+        ]
+
+
+def decompress(body, content_encoding=None):
+    encoding = (content_encoding or "identity").strip().lower()
+    if encoding == "identity":
+        data = body
+    elif encoding in ("gzip", "deflate"):
+        # wbits 31 = gzip container, 15 = zlib (HTTP "deflate")
+        d = zlib.decompressobj(31 if encoding == "gzip" else 15)
+        try:
+            data = d.decompress(body, MAX_FRAME_BYTES + 1)
+        except zlib.error as e:
+            raise WireFormatError(f"Corrupt {encoding} body: {e}")
+    else:
+        raise WireFormatError(f"Unsupported Content-Encoding: {encoding}")
+
+    if len(data) > MAX_FRAME_BYTES:
+        raise WireFormatError("Frame too large")
+    return data
+
+
+def decode_frame(body, content_encoding=None):
+    """Parse a (possibly compressed) frame without per-record Python work"""
+    data = decompress(body, content_encoding)
+
+    if len(data) < HEADER.size:
+        raise WireFormatError("Truncated header")
+    magic, version, flags, user_id, base_ts, count, game_len = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise WireFormatError("Bad magic")
+    if version != VERSION:
+        raise WireFormatError(f"Unsupported version {version}")
+
+    offset = HEADER.size
+    try:
+        game = data[offset:offset + game_len].decode("utf-8")
+    except UnicodeDecodeError:
+        raise WireFormatError("Game name is not UTF-8")
+    offset += game_len
+
+    server = None
+    if flags & FLAG_SERVER:
+        if len(data) <= offset:
+            raise WireFormatError("Truncated server name")
+        server_len = data[offset]
+        try:
+            server = data[offset + 1:offset + 1 + server_len].decode("utf-8")
+        except UnicodeDecodeError:
+            raise WireFormatError("Server name is not UTF-8")
+        offset += 1 + server_len
+
+    dtype = record_dtype(flags)
+    if len(data) - offset != count * dtype.itemsize:
+        raise WireFormatError(f"Expected {count} records, got {len(data) - offset} bytes")
+
+    records = np.frombuffer(data, dtype=dtype, count=count, offset=offset)
+    if not all(np.isfinite(records[name]).all() for name in ("ping", "jitter", "loss")):
+        raise WireFormatError("Non-finite sample values")
+
+    return Frame(user_id=user_id, game=game, base_ts=base_ts, records=records, server=server)
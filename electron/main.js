@@ -12,9 +12,10 @@ function startAgent() {
   if (agentProcess) return;
 
   try {
-    const agentPath = path.join(__dirname, "..", "agent", "lagsense_background_agent.py");
-    
-    agentProcess = spawn("python", [agentPath], {
+    const agentDir = path.join(__dirname, "..", "agent");
+
+    agentProcess = spawn("python", ["-m", "lagsense_agent"], {
+      cwd: agentDir,
       windowsHide: true,
       detached: false
     });
@@ -77,17 +77,19 @@ function loadUsername() {
 async function loadStatistics() {
   try {
     const res = await fetch(`${API}/statistics/${userId}`);
-    const data = await res.json();
-
-    document.getElementById("totalSessions").innerText = data.total_sessions || 0;
-    document.getElementById("bestGame").innerText = (data.best_game || "N/A").toUpperCase();
-    document.getElementById("worstGame").innerText = (data.worst_game || "N/A").toUpperCase();
-    document.getElementById("totalPlaytime").innerText = (data.total_play_time || 0).toFixed(1) + "h";
+    renderStatistics(await res.json());
   } catch (err) {
     console.error("Failed to load statistics:", err);
   }
 }
 
+function renderStatistics(data) {
+  document.getElementById("totalSessions").innerText = data.total_sessions || 0;
+  document.getElementById("bestGame").innerText = (data.best_game || "N/A").toUpperCase();
+  document.getElementById("worstGame").innerText = (data.worst_game || "N/A").toUpperCase();
+  document.getElementById("totalPlaytime").innerText = (data.total_play_time || 0).toFixed(1) + "h";
+}
+
 // ---------- LIVE AUTO-DETECT ----------------
 async function pollLive() {
   populateGames();
@@ -98,28 +100,7 @@ async function pollLive() {
       const data = await res.json();
 
       if (data && data.ping !== undefined) {
-        document.getElementById("gameSelect").value = game;
-
-        const ping = parseFloat(data.ping);
-        const jitter = parseFloat(data.jitter);
-        const loss = parseFloat(data.loss);
-        const thresholds = userThresholds[game] || defaultThresholds[game];
-
-        document.getElementById("ping").innerText = ping.toFixed(1);
-        document.getElementById("jitter").innerText = jitter.toFixed(1);
-        document.getElementById("packetLoss").innerText = loss.toFixed(2);
-
-        const healthScore = calculateHealthScore(ping, jitter, loss, thresholds);
-        document.getElementById("healthScore").innerText = healthScore.toFixed(0);
-
-        document.getElementById("ping").className =
-          "metric-value " + healthClass(ping, thresholds.ping);
-        document.getElementById("jitter").className =
-          "metric-value " + healthClass(jitter, thresholds.jitter);
-        document.getElementById("packetLoss").className =
-          "metric-value " + healthClass(loss, thresholds.loss);
-        document.getElementById("healthScore").className =
-          "metric-value " + (healthScore >= 80 ? "good" : healthScore >= 50 ? "avg" : "bad");
+        const { ping, jitter, loss, thresholds } = renderLive(game, data);
 
         // Check for notifications
         checkNotifications(ping, jitter, loss, game, thresholds);
@@ -132,6 +113,33 @@ async function pollLive() {
   }
 }
 
+function renderLive(game, data) {
+  document.getElementById("gameSelect").value = game;
+
+  const ping = parseFloat(data.ping);
+  const jitter = parseFloat(data.jitter);
+  const loss = parseFloat(data.loss);
+  const thresholds = userThresholds[game] || defaultThresholds[game];
+
+  document.getElementById("ping").innerText = ping.toFixed(1);
+  document.getElementById("jitter").innerText = jitter.toFixed(1);
+  document.getElementById("packetLoss").innerText = loss.toFixed(2);
+
+  const healthScore = calculateHealthScore(ping, jitter, loss, thresholds);
+  document.getElementById("healthScore").innerText = healthScore.toFixed(0);
+
+  document.getElementById("ping").className =
+    "metric-value " + healthClass(ping, thresholds.ping);
+  document.getElementById("jitter").className =
+    "metric-value " + healthClass(jitter, thresholds.jitter);
+  document.getElementById("packetLoss").className =
+    "metric-value " + healthClass(loss, thresholds.loss);
+  document.getElementById("healthScore").className =
+    "metric-value " + (healthScore >= 80 ? "good" : healthScore >= 50 ? "avg" : "bad");
+
+  return { ping, jitter, loss, thresholds };
+}
+
 // ---------- CHECK NOTIFICATIONS ----------------
 async function checkNotifications(ping, jitter, loss, game, thresholds) {
   try {
@@ -172,48 +180,106 @@ function requestNotificationPermission() {
 }
 
 // ---------- LOAD SESSIONS ----------------
-async function loadSessions() {
+let sessionsCursor = null;
+
+function sessionLabel(s) {
+  const start = new Date(s.start_time + "Z");
+  const when = start.toLocaleString();
+  // Open sessions have no duration from the API: count it from the start
+  const seconds = s.open ? (Date.now() - start.getTime()) / 1000 : s.duration;
+  const mins = Math.max(0, Math.round(seconds / 60));
+  const verdict = s.verdict && s.verdict !== "Unknown" ? ` · ${s.verdict}` : "";
+  return `${when} · ${mins}m · ${s.avg_ping.toFixed(0)}ms${verdict}${s.open ? " · live" : ""}`;
+}
+
+async function loadSessions(more = false) {
   const game = document.getElementById("gameSelect").value;
   if (!game) return;
 
   try {
-    const res = await fetch(`${API}/sessions/${userId}/${game}`);
-    const sessions = await res.json();
-
-    const select = document.getElementById("sessionSelect");
-    select.innerHTML = "";
+    const params = new URLSearchParams({ limit: 50 });
+    if (more && sessionsCursor !== null) params.set("cursor", sessionsCursor);
 
-    if (sessions.length === 0) {
-      const opt = document.createElement("option");
-      opt.textContent = "No sessions found";
-      select.appendChild(opt);
-      return;
-    }
-
-    sessions.forEach(s => {
-      const opt = document.createElement("option");
-      opt.value = s;
-      opt.textContent = new Date(s).toLocaleString();
-      select.appendChild(opt);
-    });
+    const res = await fetch(`${API}/sessions/${userId}/${game}?${params}`);
+    renderSessions(await res.json(), more);
   } catch (err) {
     console.error("Load sessions error:", err);
     alert("Failed to load sessions");
   }
 }
 
+function renderSessions(data, more = false) {
+  const sessions = data.sessions || [];
+
+  const select = document.getElementById("sessionSelect");
+  if (!more) select.innerHTML = "";
+  const moreOpt = select.querySelector("option[value='more']");
+  if (moreOpt) moreOpt.remove();
+
+  if (!more && sessions.length === 0) {
+    const opt = document.createElement("option");
+    opt.textContent = "No sessions found";
+    opt.value = "";
+    select.appendChild(opt);
+    return;
+  }
+
+  sessions.forEach(s => {
+    const opt = document.createElement("option");
+    opt.value = s.id;
+    opt.textContent = sessionLabel(s);
+    select.appendChild(opt);
+  });
+
+  sessionsCursor = data.next_cursor;
+  if (sessionsCursor !== null) {
+    const opt = document.createElement("option");
+    opt.value = "more";
+    opt.textContent = "⋯ Load older sessions";
+    select.appendChild(opt);
+  }
+}
+
+// ---------- LOAD DASHBOARD ----------------
+// One request for everything the first render needs. The browser keeps the
+// last body and revalidates it with If-None-Match, so an unchanged
+// dashboard comes back as a bodiless 304.
+async function loadDashboard() {
+  try {
+    const res = await fetch(`${API}/dashboard/${userId}?limit=50`);
+    const data = await res.json();
+
+    if (data.settings && data.settings.thresholds) {
+      userThresholds = data.settings.thresholds;
+    }
+    renderStatistics(data.statistics || {});
+    populateGames();
+    document.getElementById("gameSelect").value = data.game;
+    renderSessions(data.sessions || {});
+    if (data.live) renderLive(data.live.game, data.live);
+  } catch (err) {
+    console.error("Failed to load dashboard:", err);
+    loadUserSettings();
+    loadStatistics();
+    populateGames();
+  }
+}
+
+document.getElementById("sessionSelect").addEventListener("change", (e) => {
+  if (e.target.value === "more") loadSessions(true);
+});
+
 // ---------- ANALYZE SESSION ----------------
 async function analyzeSession() {
-  const game = document.getElementById("gameSelect").value;
   const session = document.getElementById("sessionSelect").value;
   
-  if (!session) {
+  if (!session || session === "more") {
     alert("Please select a session first");
     return;
   }
 
   try {
-    const res = await fetch(`${API}/session/${userId}/${game}/${session}`);
+    const res = await fetch(`${API}/session/${userId}/${session}`);
     const data = await res.json();
 
     if (data.error) {
@@ -342,8 +408,6 @@ function logout() {
 // ---------- START EVERYTHING ----------------
 requestNotificationPermission();
 loadUsername();
-loadUserSettings();
-loadStatistics();
-populateGames();
+loadDashboard();
 setInterval(pollLive, 2000);
 setInterval(loadStatistics, 60000); // Update stats every minute
\ No newline at end of file